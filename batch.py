@@ -0,0 +1,285 @@
+"""
+Generate many decks from a manifest, without prompts.
+
+Usage:
+    python batch.py event.yaml                     # Writes every deck + event_report.json
+    python batch.py event.json --workers 8
+    python batch.py tables.csv --report summary.json
+
+Manifest (YAML needs PyYAML; JSON is the same structure):
+
+    defaults:                      # Optional, applied to every deck
+      songs_per_playlist: 10
+      duplicates: drop
+    decks:
+      - name: table-1              # Output defaults to <name>.pdf
+        playlists:
+          - https://open.spotify.com/playlist/...
+          - https://open.spotify.com/playlist/...
+      - name: table-2
+        output: decks/table-2.pdf
+        songs_per_playlist: 15
+        sample: true
+        seed: 2
+        playlists: [...]
+
+A CSV manifest has one row per deck with a header naming the same keys;
+`playlists` holds the URLs separated by spaces or semicolons.
+
+Output paths are relative to the manifest's directory. All decks share one
+Spotify client, rate limiter and track cache; fetching runs on a thread pool
+and rendering on a process pool, both config.BATCH_WORKERS wide.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+import config
+import metrics
+
+
+DECK_KEYS = ("name", "output", "playlists", "songs_per_playlist", "duplicates", "sample", "seed")
+
+_TRUE_STRINGS = ("1", "true", "yes", "on")
+
+
+def _load_manifest_data(path):
+    """Read a manifest file into {"defaults": {...}, "decks": [...]}."""
+    lower = path.lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if lower.endswith(".csv"):
+            return {"decks": [
+                {key.strip(): value for key, value in row.items() if key and value not in (None, "")}
+                for row in csv.DictReader(f)
+            ]}
+        if lower.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("YAML manifests need PyYAML (pip install pyyaml); "
+                                 "use a JSON or CSV manifest instead")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    return {"decks": data} if isinstance(data, list) else (data or {})
+
+
+def _int_option(index, deck, key):
+    value = deck.get(key)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Deck {index}: {key} must be an integer, not {value!r}")
+
+
+def _normalize_deck(index, deck, base_dir):
+    unknown = sorted(set(deck) - set(DECK_KEYS))
+    if unknown:
+        raise ValueError(f"Deck {index}: unknown keys {', '.join(unknown)}")
+
+    playlists = deck.get("playlists")
+    if isinstance(playlists, str):
+        playlists = [url for url in re.split(r"[\s;,]+", playlists) if url]
+    if not playlists:
+        raise ValueError(f"Deck {index}: needs at least one playlist")
+
+    name = str(deck.get("name") or f"deck-{index}")
+    output = deck.get("output") or f"{name}.pdf"
+
+    sample = deck.get("sample")
+    if isinstance(sample, str):
+        sample = sample.strip().lower() in _TRUE_STRINGS
+
+    duplicates = deck.get("duplicates")
+    if duplicates not in (None, "keep", "drop"):
+        raise ValueError(f"Deck {index}: duplicates must be 'keep' or 'drop', not {duplicates!r}")
+
+    songs_per_playlist = _int_option(index, deck, "songs_per_playlist")
+    if songs_per_playlist is not None and songs_per_playlist <= 0:
+        raise ValueError(f"Deck {index}: songs_per_playlist must be positive")
+    seed = _int_option(index, deck, "seed")
+
+    return {
+        "name": name,
+        "output": os.path.join(base_dir, output),
+        "playlists": list(playlists),
+        "songs_per_playlist": songs_per_playlist,
+        "duplicates": duplicates,
+        "sample": sample,
+        "seed": seed,
+    }
+
+
+def load_manifest(path):
+    """
+    Load and validate a batch manifest.
+
+    Args:
+        path: Manifest file (.yaml/.yml, .json or .csv)
+
+    Returns:
+        List of deck dicts with keys: name, output, playlists, songs_per_playlist,
+        duplicates, sample, seed (unset options are None and fall back to config)
+    """
+    data = _load_manifest_data(path)
+    defaults = data.get("defaults") or {}
+    decks = data.get("decks") or []
+    if not decks:
+        raise ValueError(f"No decks in manifest {path}")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    decks = [_normalize_deck(i + 1, {**defaults, **deck}, base_dir) for i, deck in enumerate(decks)]
+
+    outputs = [deck["output"] for deck in decks]
+    duplicated = sorted({output for output in outputs if outputs.count(output) > 1})
+    if duplicated:
+        raise ValueError(f"Several decks write to the same file: {', '.join(duplicated)}")
+
+    return decks
+
+
+_worker_generator = None
+
+
+def _render_deck(songs, output_file):
+    """Process pool entry point: render one deck with a per-process generator."""
+    global _worker_generator
+    if _worker_generator is None:
+        from pdf_generator import PDFGenerator
+        _worker_generator = PDFGenerator()
+
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    return _worker_generator.generate_pdf(songs, output_file, workers=1)
+
+
+def _build_deck(spotify, render_pool, deck):
+    started = time.perf_counter()
+    result = {"name": deck["name"], "output": deck["output"], "playlists": len(deck["playlists"])}
+
+    try:
+        songs = spotify.get_multiple_playlists(
+            deck["playlists"], deck["songs_per_playlist"], deck["duplicates"],
+            deck["sample"], deck["seed"]
+        )
+        fetched = time.perf_counter()
+        result["songs"] = len(songs)
+        if not songs:
+            raise ValueError("no songs fetched, check the playlist URLs")
+
+        result["cards"] = render_pool.submit(_render_deck, list(songs), deck["output"]).result()
+        result["fetch_seconds"] = round(fetched - started, 3)
+        result["render_seconds"] = round(time.perf_counter() - fetched, 3)
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_batch(decks, workers=None, spotify=None):
+    """
+    Fetch and render every deck of a manifest.
+
+    A failing deck is recorded in the report and doesn't stop the others.
+
+    Args:
+        decks: Deck dicts as returned by load_manifest
+        workers: Decks fetched/rendered at the same time (default: config.BATCH_WORKERS)
+        spotify: SpotifyClient to share (default: a new one)
+
+    Returns:
+        Report dict with keys: decks (one result per deck, in manifest order),
+        ok, failed, cards, seconds, track_cache
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    from spotify_client import SpotifyClient
+
+    workers = max(1, workers or config.BATCH_WORKERS)
+    spotify = spotify or SpotifyClient()
+    started = time.perf_counter()
+
+    # Spawned rather than forked: the pool grows from fetch threads, which may
+    # hold the metrics, sqlite or urllib3 locks a forked child would inherit
+    render_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=render_context) as render_pool, \
+            ThreadPoolExecutor(max_workers=workers) as fetch_pool:
+        futures = [fetch_pool.submit(_build_deck, spotify, render_pool, deck) for deck in decks]
+        results = []
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            mark = "✓" if result["status"] == "ok" else "✗"
+            detail = f"{result.get('cards', 0)} cards" if result["status"] == "ok" else result["error"]
+            print(f"{mark} {result['name']}: {detail} ({result['seconds']:.1f}s)")
+
+    return {
+        "decks": results,
+        "ok": sum(result["status"] == "ok" for result in results),
+        "failed": sum(result["status"] != "ok" for result in results),
+        "cards": sum(result.get("cards", 0) for result in results),
+        "seconds": round(time.perf_counter() - started, 3),
+        "track_cache": spotify.track_cache.stats() if spotify.track_cache else None,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate many decks from a YAML/JSON/CSV manifest without prompts."
+    )
+    parser.add_argument("manifest", help="Manifest file (.yaml, .json or .csv)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Decks built at the same time (default: config.BATCH_WORKERS)")
+    parser.add_argument("--report", default=None,
+                        help="Summary report to write (default: <manifest>_report.json)")
+    metrics.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        decks = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"\nERROR: Could not read manifest {args.manifest}: {e}")
+        sys.exit(1)
+
+    if not config.SPOTIFY_CLIENT_ID or not config.SPOTIFY_CLIENT_SECRET:
+        print("\nERROR: Spotify API credentials not found! "
+              "Set SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET in .env")
+        sys.exit(1)
+
+    if args.profile:
+        # Decks render in worker processes, so this covers the fetch stages
+        metrics.enable()
+
+    print(f"Building {len(decks)} decks from {args.manifest}...")
+    report = run_batch(decks, args.workers)
+    report["manifest"] = args.manifest
+
+    report_file = args.report or os.path.splitext(args.manifest)[0] + "_report.json"
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{report['ok']}/{len(decks)} decks built, {report['cards']} cards "
+          f"in {report['seconds']:.1f}s | Report: {report_file}")
+
+    if args.profile:
+        metrics.write_profile(args.profile, args.profile_format)
+    if report["failed"]:
+        sys.exit(1)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Fetch throughput against the local fake Spotify API (no network needed).
+
+Usage:
+    python benchmarks/bench_fetch.py                                  # Default scenarios
+    python benchmarks/bench_fetch.py --latency 80 --throttle-every 40 --retry-after 1
+    python benchmarks/bench_fetch.py --library-size 10000 --json results.json
+
+Runs the playlist client (SAMPLE_PLAYLISTS off and on) and the liked-songs
+fetch (serial next links vs. parallel offsets) against an in-process
+fake_spotify server. Caches are disabled so every run is cold. Reports songs/sec
+and what the server saw: requests, 429s, 503s and bytes. "during 429" counts
+requests that arrived while a 429's Retry-After was still running; it must be
+0 (every worker pauses on a 429), otherwise the run exits with status 1.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from fake_spotify import FakeCatalog, FakeSpotifyServer, FaultInjector  # noqa: E402
+
+
+def _fake_spotify(server):
+    import spotipy
+    from rate_limiter import SERVER_ERROR_CODES
+
+    # A fixed token: client credentials would cache the fake token in ./.cache,
+    # where a real run would pick it up
+    sp = spotipy.Spotify(auth="fake-token", status_forcelist=SERVER_ERROR_CODES)
+    sp.prefix = server.api_url
+    return sp
+
+
+def _playlists(server, args, sample):
+    from spotify_client import SpotifyClient
+
+    config.SAMPLE_PLAYLISTS = sample
+    client = SpotifyClient(sp=_fake_spotify(server))
+    urls = [f"player{i}size{args.playlist_size}" for i in range(args.playlists)]
+    return len(client.get_multiple_playlists(urls, args.songs_per_playlist))
+
+
+def _liked(server, args, parallel):
+    from liked_songs_filter import LikedSongsFilter
+
+    config.PARALLEL_LIBRARY_FETCH = parallel
+    sp = _fake_spotify(server)
+    return len(LikedSongsFilter(popularity_threshold=0, sp=sp).get_filtered_liked_songs())
+
+
+SCENARIOS = {
+    "playlists": lambda server, args: _playlists(server, args, sample=False),
+    "playlists_sampled": lambda server, args: _playlists(server, args, sample=True),
+    "liked_serial": lambda server, args: _liked(server, args, parallel=False),
+    "liked_parallel": lambda server, args: _liked(server, args, parallel=True),
+}
+
+
+def run_scenario(name, server, args):
+    """
+    Returns:
+        Dict with keys: scenario, songs, seconds, songs_per_sec, requests, throttled,
+        requests_during_throttle, server_errors, bytes
+    """
+    server.reset()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        songs = SCENARIOS[name](server, args)
+    seconds = time.perf_counter() - start
+    stats = server.stats()
+    return {
+        "scenario": name,
+        "songs": songs,
+        "seconds": round(seconds, 3),
+        "songs_per_sec": round(songs / seconds, 1) if seconds else None,
+        "requests": stats.get("requests", 0),
+        "throttled": stats.get("status:429", 0),
+        "requests_during_throttle": server.requests_during_throttle(),
+        "server_errors": stats.get("status:503", 0),
+        "bytes": stats.get("bytes_sent", 0),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch throughput against the fake Spotify API.")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--playlists", type=int, default=8, help="Playlists per deck (default: 8)")
+    parser.add_argument("--playlist-size", type=int, default=2000, help="Tracks per playlist (default: 2000)")
+    parser.add_argument("--songs-per-playlist", type=int, default=25, help="Songs taken from each (default: 25)")
+    parser.add_argument("--library-size", type=int, default=5000, help="Saved tracks (default: 5000)")
+    parser.add_argument("--latency", type=float, default=30, help="Server latency in ms (default: 30)")
+    parser.add_argument("--throttle-every", type=int, default=0, help="429 burst every N requests")
+    parser.add_argument("--throttle-burst", type=int, default=1, help="429 responses per burst")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument("--requests-per-second", type=float, default=config.REQUESTS_PER_SECOND,
+                        help="Client-side rate limit (default: config.REQUESTS_PER_SECOND)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    # Cold, isolated runs: no caches on disk, fake credentials and endpoints
+    config.TRACK_CACHE_PATH = None
+    config.LIBRARY_INDEX_PATH = None
+    config.MIN_TRACK_POPULARITY = 0
+    config.REQUESTS_PER_SECOND = args.requests_per_second
+    config.SPOTIFY_CLIENT_ID = config.SPOTIFY_CLIENT_SECRET = "fake"
+
+    catalog = FakeCatalog(playlist_size=args.playlist_size, library_size=args.library_size)
+    faults = FaultInjector(args.latency, 0, args.throttle_every, args.throttle_burst,
+                           args.retry_after, args.error_rate)
+
+    results = []
+    with FakeSpotifyServer(catalog=catalog, faults=faults) as server:
+        config.SPOTIFY_API_URL = server.api_url
+        config.SPOTIFY_ACCOUNTS_URL = server.base_url
+
+        print(f"{'scenario':<20} {'songs':>7} {'seconds':>8} {'songs/s':>9} {'requests':>9}"
+              f" {'429s':>5} {'during 429':>10} {'503s':>5} {'KB':>8}")
+        for name in args.scenarios:
+            result = run_scenario(name, server, args)
+            results.append(result)
+            print(f"{name:<20} {result['songs']:>7} {result['seconds']:>8.2f} {result['songs_per_sec']:>9.1f}"
+                  f" {result['requests']:>9} {result['throttled']:>5} {result['requests_during_throttle']:>10}"
+                  f" {result['server_errors']:>5}"
+                  f" {result['bytes'] / 1024:>8.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if any(result["requests_during_throttle"] for result in results):
+        print("\n✗ Requests kept arriving during a 429 backoff")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Offline benchmarks for the parse and render hot paths.
+
+Usage:
+    python benchmarks/bench_render.py                          # All stages, 100/1k/10k songs
+    python benchmarks/bench_render.py --sizes 100 1000 --stages qr_matrix generate_pdf
+    python benchmarks/bench_render.py --save benchmarks/baseline.json
+    python benchmarks/bench_render.py --compare benchmarks/baseline.json
+
+Decks are synthetic (see synthetic.py): long titles, many artists and non-ASCII
+text, no network needed. Every (stage, size) runs in a fresh process, so caches
+start cold and peak RSS belongs to that stage alone. With --compare, the
+exit status is 1 if any stage got slower than the tolerance allows.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+
+def _stage_parse_tracks(count):
+    from song import Deck, song_from_track
+    from synthetic import synthetic_tracks
+
+    tracks = synthetic_tracks(count)
+    start = time.perf_counter()
+    Deck(song_from_track(track) for track in tracks)
+    return time.perf_counter() - start, None
+
+
+def _stage_qr_matrix(count):
+    from qr_generator import QRGenerator
+    from synthetic import synthetic_deck
+
+    urls = synthetic_deck(count).column('url')
+    generator = QRGenerator()
+    start = time.perf_counter()
+    for url in urls:
+        generator.generate_qr_matrix(url)
+    return time.perf_counter() - start, None
+
+
+def _stage_qr_bytes(count):
+    from qr_generator import QRGenerator
+    from synthetic import synthetic_deck
+
+    urls = synthetic_deck(count).column('url')
+    generator = QRGenerator()
+    start = time.perf_counter()
+    for url in urls:
+        generator.generate_qr_bytes(url)
+    return time.perf_counter() - start, None
+
+
+def _stage_wrap_text(count):
+    from reportlab.pdfgen import canvas
+    from pdf_generator import PDFGenerator
+    from synthetic import synthetic_deck
+
+    deck = synthetic_deck(count)
+    pdf = PDFGenerator()
+    c = canvas.Canvas(io.BytesIO())
+    max_width = pdf.card_width - 16
+    start = time.perf_counter()
+    for song in deck:
+        pdf._wrap_text(c, song.title, "Helvetica-Bold", 20, max_width)
+        pdf._wrap_text(c, song.artists, "Helvetica", 16, max_width)
+    return time.perf_counter() - start, None
+
+
+def _stage_draw_info_card(count):
+    from pdf_generator import PDFGenerator
+    from synthetic import synthetic_deck
+
+    deck = synthetic_deck(count)
+    pdf = PDFGenerator()
+    output = io.BytesIO()
+    c = pdf._new_canvas(output)
+    start = time.perf_counter()
+    for i, song in enumerate(deck):
+        card_index = i % pdf.cards_per_page
+        pdf._draw_info_card(c, song, card_index)
+        if card_index == pdf.cards_per_page - 1:
+            c.showPage()
+    elapsed = time.perf_counter() - start
+    c.save()
+    return elapsed, len(output.getvalue())
+
+
+def _stage_generate_pdf(count):
+    from pdf_generator import PDFGenerator
+    from synthetic import synthetic_deck
+
+    deck = synthetic_deck(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        output_file = os.path.join(tmp, "bench.pdf")
+        start = time.perf_counter()
+        PDFGenerator().generate_pdf(deck, output_file)
+        elapsed = time.perf_counter() - start
+        return elapsed, os.path.getsize(output_file)
+
+
+STAGES = {
+    "parse_tracks": _stage_parse_tracks,
+    "qr_matrix": _stage_qr_matrix,
+    "qr_bytes": _stage_qr_bytes,
+    "wrap_text": _stage_wrap_text,
+    "draw_info_card": _stage_draw_info_card,
+    "generate_pdf": _stage_generate_pdf,
+}
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_child(stage, count):
+    """Entry point of the per-stage process: print one JSON result line."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds, pdf_bytes = STAGES[stage](count)
+    print(json.dumps({
+        "stage": stage,
+        "songs": count,
+        "seconds": round(seconds, 4),
+        "cards_per_sec": round(count / seconds, 1) if seconds else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "pdf_bytes": pdf_bytes,
+    }))
+
+
+def run_stage(stage, count):
+    """
+    Run one stage in a fresh interpreter.
+
+    Returns:
+        Dict with keys: stage, songs, seconds, cards_per_sec, peak_rss_mb, pdf_bytes
+    """
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", stage, str(count)],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print speed changes against a baseline.
+
+    Returns:
+        List of "stage@songs" keys that got slower by more than tolerance
+    """
+    previous = {(r["stage"], r["songs"]): r for r in baseline["results"]}
+    regressions = []
+
+    print(f"\nCompared with baseline from {baseline.get('created', 'unknown')}:")
+    for result in results:
+        old = previous.get((result["stage"], result["songs"]))
+        if not old or not old["cards_per_sec"] or not result["cards_per_sec"]:
+            continue
+        change = result["cards_per_sec"] / old["cards_per_sec"] - 1
+        key = f"{result['stage']}@{result['songs']}"
+        flag = ""
+        if change < -tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"  {key:<26} {old['cards_per_sec']:>10.1f} -> {result['cards_per_sec']:>10.1f}"
+              f" cards/s ({change:+.0%}){flag}")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the render hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Deck sizes (default: 100 1000 10000)")
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), default=list(STAGES),
+                        help="Stages to run (default: all)")
+    parser.add_argument("--save", metavar="FILE", help="Write the results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="FILE", help="Compare with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Slowdown allowed by --compare before failing (default: 0.15)")
+    parser.add_argument("--child", nargs=2, metavar=("STAGE", "SONGS"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _run_child(args.child[0], int(args.child[1]))
+        return 0
+
+    print(f"{'stage':<16} {'songs':>7} {'seconds':>9} {'cards/s':>10} {'peak RSS':>10} {'PDF bytes':>11}")
+    results = []
+    for stage in args.stages:
+        for count in args.sizes:
+            result = run_stage(stage, count)
+            results.append(result)
+            pdf_bytes = f"{result['pdf_bytes']:,}" if result["pdf_bytes"] else "-"
+            print(f"{stage:<16} {count:>7} {result['seconds']:>9.3f} {result['cards_per_sec']:>10.1f}"
+                  f" {result['peak_rss_mb']:>7.1f} MB {pdf_bytes:>11}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n✗ Slower than baseline: {', '.join(regressions)}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
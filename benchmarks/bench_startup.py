@@ -0,0 +1,131 @@
+"""
+Startup benchmark: import time of the entry points and `--help` latency.
+
+Usage:
+    python benchmarks/bench_startup.py             # Report and check the budget
+    python benchmarks/bench_startup.py --runs 20   # More runs for a steadier median
+
+Times are measured in fresh interpreters and reported as overhead on top of a
+bare `python -c pass`, so the budget holds across machines. Exits with status 1
+if a command is over budget or an entry point imports a heavy dependency
+before it needs it, so it can run as a check in CI.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Median milliseconds allowed on top of bare interpreter startup
+HELP_BUDGET_MS = {
+    "main.py": 60,
+    "render_deck.py": 60,
+    "batch.py": 60,
+    "server.py": 100,  # http.server (and the email package it imports) is ~30 ms
+}
+IMPORT_BUDGET_MS = {
+    "main": 40,
+    "render_deck": 40,
+    "batch": 40,
+    "server": 80,
+    "liked_songs_filter": 80,
+}
+
+# Must not be loaded just by importing an entry point (or by --help)
+HEAVY_MODULES = ("spotipy", "requests", "reportlab", "qrcode", "PIL", "dotenv")
+
+
+def _run(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return (time.perf_counter() - start) * 1000
+
+
+def _median_ms(args, runs):
+    _run(args)  # Warm the filesystem and bytecode caches
+    return statistics.median(_run(args) for _ in range(runs))
+
+
+def _heavy_modules_loaded(code):
+    probe = (
+        f"import sys\n{code}\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, check=True,
+                            capture_output=True, text=True)
+    loaded = result.stdout.strip().splitlines()
+    return loaded[-1].split(",") if loaded and loaded[-1] else []
+
+
+def _slowest_imports(module, count=5):
+    """Slowest direct imports of a module (cumulative ms), from `python -X importtime`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, check=True, capture_output=True, text=True)
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            # A finished top-level import (e.g. site during startup) closes
+            # the block of children collected so far
+            if name.strip() == module:
+                break
+            timings = []
+        elif depth == 1:
+            timings.append((int(cumulative) / 1000, name.strip()))
+    return sorted(timings, reverse=True)[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure CLI startup time against a budget.")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per command (default: 10)")
+    args = parser.parse_args(argv)
+
+    baseline = _median_ms(["-c", "pass"], args.runs)
+    print(f"Bare interpreter startup: {baseline:.1f} ms (subtracted below)\n")
+
+    failures = []
+
+    def check(label, elapsed, budget):
+        elapsed = max(0.0, elapsed)
+        status = "ok" if elapsed <= budget else "OVER BUDGET"
+        print(f"  {label:<38} {elapsed:7.1f} ms  (budget {budget} ms)  {status}")
+        if elapsed > budget:
+            failures.append(label)
+
+    print("--help latency:")
+    for script, budget in HELP_BUDGET_MS.items():
+        check(f"python {script} --help", _median_ms([script, "--help"], args.runs) - baseline, budget)
+
+    print("\nImport time:")
+    for module, budget in IMPORT_BUDGET_MS.items():
+        check(f"import {module}", _median_ms(["-c", f"import {module}"], args.runs) - baseline, budget)
+
+    print("\nHeavy dependencies loaded at import:")
+    for module in IMPORT_BUDGET_MS:
+        loaded = _heavy_modules_loaded(f"import {module}")
+        print(f"  {module:<38} {', '.join(loaded) or 'none'}")
+        if loaded:
+            failures.append(f"import {module} loads {', '.join(loaded)}")
+
+    print("\nSlowest imports made by main (cumulative):")
+    for elapsed, name in _slowest_imports("main"):
+        print(f"  {name:<38} {elapsed:7.1f} ms")
+
+    if failures:
+        print(f"\n✗ Startup budget exceeded: {'; '.join(failures)}")
+        return 1
+    print("\n✓ Startup within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
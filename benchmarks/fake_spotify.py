@@ -0,0 +1,387 @@
+"""
+Local stand-in for the Spotify Web API, for load and regression tests.
+
+Usage:
+    python benchmarks/fake_spotify.py --port 8765 --latency 40 --throttle-every 50
+
+    # Then point the app at it (config.py):
+    #   SPOTIFY_API_URL = "http://127.0.0.1:8765/v1/"
+    #   SPOTIFY_ACCOUNTS_URL = "http://127.0.0.1:8765"
+
+Serves generated data (see synthetic.py), deterministic per ID:
+    POST /api/token                    client-credentials token (any credentials)
+    GET  /v1/playlists/{id}            snapshot_id and tracks.total
+    GET  /v1/playlists/{id}/tracks     playlist pages (limit/offset, absolute next links)
+    GET  /v1/me/tracks                 saved-tracks pages, newest first
+    GET  /v1/tracks/?ids=...           several tracks (null for unknown IDs)
+    GET  /__stats                      request/response counters as JSON
+    POST /__reset                      zero the counters
+
+Playlists have --playlist-size tracks, unless the ID ends in size<N>
+(e.g. "bigsize5000" has 5000; spotipy only accepts alphanumeric IDs).
+Any playlist ID exists.
+
+Faults: --latency/--jitter delay every API response; --throttle-every N makes
+every Nth request start a burst of --throttle-burst 429 responses carrying a
+Retry-After of --retry-after seconds; --error-rate returns random 503s.
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic import synthetic_track  # noqa: E402
+
+
+_SIZED_ID_RE = re.compile(r'size(\d+)$')
+_LIBRARY_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeCatalog:
+    """Generated playlists, saved tracks and a track registry, built on demand."""
+
+    def __init__(self, playlist_size=200, library_size=2000, seed=0):
+        self.playlist_size = playlist_size
+        self.library_size = library_size
+        self.seed = seed
+        self._playlists = {}
+        self._library = None
+        self._tracks = {}
+        self._lock = threading.Lock()
+
+    def _generate(self, key, count):
+        rng = random.Random(f"{self.seed}:{key}")
+        tracks = [synthetic_track(rng) for _ in range(count)]
+        self._tracks.update((track['id'], track) for track in tracks)
+        return tracks
+
+    def playlist(self, playlist_id):
+        with self._lock:
+            tracks = self._playlists.get(playlist_id)
+            if tracks is None:
+                match = _SIZED_ID_RE.search(playlist_id)
+                size = int(match.group(1)) if match else self.playlist_size
+                tracks = self._playlists[playlist_id] = self._generate(playlist_id, size)
+            return tracks
+
+    def library(self):
+        with self._lock:
+            if self._library is None:
+                tracks = self._generate("library", self.library_size)
+                # Newest save first, one save per hour going back in time
+                self._library = [
+                    {'added_at': (_LIBRARY_EPOCH - timedelta(hours=i)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                     'track': track}
+                    for i, track in enumerate(tracks)
+                ]
+            return self._library
+
+    def track(self, track_id):
+        with self._lock:
+            return self._tracks.get(track_id)
+
+
+class FaultInjector:
+    """Decides per request whether to delay, throttle (429) or fail (503)."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, throttle_every=0, throttle_burst=1,
+                 retry_after=1, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_every = throttle_every
+        self.throttle_burst = throttle_burst
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._requests = 0
+        self._burst_left = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self._lock:
+                jitter = self._rng.uniform(0, self.jitter_ms)
+            time.sleep((self.latency_ms + jitter) / 1000)
+
+    def fault(self):
+        """
+        Returns:
+            429, 503 or None (serve the request normally)
+        """
+        with self._lock:
+            self._requests += 1
+            if self.throttle_every and self._requests % self.throttle_every == 0:
+                self._burst_left = self.throttle_burst
+            if self._burst_left:
+                self._burst_left -= 1
+                return 429
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return 503
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeSpotify/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.record(status, len(data))
+
+    def _error(self, status, message, headers=None):
+        self._send_json(status, {"error": {"status": status, "message": message}}, headers)
+
+    def _page(self, path, items, query, max_limit):
+        limit = min(max_limit, self.server.page_size_cap, int(query.get("limit", 20)))
+        offset = int(query.get("offset", 0))
+        total = len(items)
+        base = f"http://{self.headers.get('Host')}{path}"
+        has_next = offset + limit < total
+        return {
+            "href": f"{base}?offset={offset}&limit={limit}",
+            "items": items[offset:offset + limit],
+            "limit": limit,
+            "offset": offset,
+            "total": total,
+            "next": f"{base}?offset={offset + limit}&limit={limit}" if has_next else None,
+            "previous": f"{base}?offset={max(0, offset - limit)}&limit={limit}" if offset else None,
+        }
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        path = urlsplit(self.path).path
+
+        if path == "/api/token":
+            self.server.count("token")
+            self._send_json(200, {"access_token": "fake-token", "token_type": "Bearer",
+                                  "expires_in": 3600})
+        elif path == "/__reset":
+            self.server.reset()
+            self._send_json(200, {})
+        else:
+            self._error(404, "Not found")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if path == "/__stats":
+            self._send_json(200, self.server.stats())
+            return
+
+        parts = path.split("/")[2:] if path.startswith("/v1/") else None
+        if not parts:
+            self._error(404, "Not found")
+            return
+
+        endpoint = self._endpoint(parts)
+        self.server.count(endpoint)
+
+        faults = self.server.faults
+        faults.delay()
+        fault = faults.fault()
+        if fault == 429:
+            self._error(429, "API rate limit exceeded", {"Retry-After": str(faults.retry_after)})
+            return
+        if fault == 503:
+            self._error(503, "Service unavailable")
+            return
+
+        catalog = self.server.catalog
+        if endpoint == "playlist":
+            tracks = catalog.playlist(parts[1])
+            self._send_json(200, {"id": parts[1], "name": f"Playlist {parts[1]}",
+                                  "snapshot_id": f"{parts[1]}-snapshot-1",
+                                  "tracks": {"total": len(tracks)}})
+        elif endpoint == "playlist_tracks":
+            items = [{"track": track} for track in catalog.playlist(parts[1])]
+            self._send_json(200, self._page(url.path, items, query, 100))
+        elif endpoint == "saved_tracks":
+            self._send_json(200, self._page(url.path, catalog.library(), query, 50))
+        elif endpoint == "tracks":
+            ids = [track_id for track_id in query.get("ids", "").split(",") if track_id]
+            if len(ids) > 50:
+                self._error(400, "Too many ids requested")
+                return
+            self._send_json(200, {"tracks": [catalog.track(track_id) for track_id in ids]})
+        else:
+            self._error(404, "Not found")
+
+    @staticmethod
+    def _endpoint(parts):
+        if parts[0] == "playlists" and len(parts) == 2:
+            return "playlist"
+        if parts[0] == "playlists" and len(parts) == 3 and parts[2] == "tracks":
+            return "playlist_tracks"
+        if parts == ["me", "tracks"]:
+            return "saved_tracks"
+        if parts == ["tracks"]:
+            return "tracks"
+        return "unknown"
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    """
+    Threaded fake Web API server; also usable in-process as a context manager.
+
+    Example:
+        with FakeSpotifyServer(catalog=FakeCatalog(library_size=10000)) as server:
+            sp = spotipy.Spotify(auth="fake-token")
+            sp.prefix = server.api_url
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, catalog=None, faults=None, page_size_cap=100):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            catalog: FakeCatalog with the data to serve
+            faults: FaultInjector (default: no faults)
+            page_size_cap: Largest page served whatever limit a client asks for
+        """
+        super().__init__((host, port), _Handler)
+        self.catalog = catalog or FakeCatalog()
+        self.faults = faults or FaultInjector()
+        self.page_size_cap = page_size_cap
+        self._counts = Counter()
+        self._arrivals = []  # time.monotonic() of every API request
+        self._throttled = []  # time.monotonic() of every 429 sent
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        """Value for config.SPOTIFY_API_URL / spotipy's prefix."""
+        return self.base_url + "/v1/"
+
+    def count(self, endpoint):
+        with self._lock:
+            self._counts["requests"] += 1
+            self._counts[f"endpoint:{endpoint}"] += 1
+            self._arrivals.append(time.monotonic())
+
+    def record(self, status, size):
+        with self._lock:
+            self._counts[f"status:{status}"] += 1
+            self._counts["bytes_sent"] += size
+            if status == 429:
+                self._throttled.append(time.monotonic())
+
+    def stats(self):
+        """
+        Returns:
+            Dict of counters: requests, bytes_sent, endpoint:<name>, status:<code>
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def requests_during_throttle(self, grace=0.05):
+        """
+        Count requests that arrived while a client should have been backing
+        off: after a 429 was sent and before its Retry-After ran out.
+
+        Args:
+            grace: Seconds ignored at both ends of each window, for requests
+                   already on the wire when the 429 went out
+
+        Returns:
+            Number of such requests (0 when every worker paused)
+        """
+        retry_after = self.faults.retry_after
+        with self._lock:
+            windows = [(t + grace, t + retry_after - grace) for t in self._throttled]
+            return sum(any(start < arrival < end for start, end in windows) for arrival in self._arrivals)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._arrivals.clear()
+            self._throttled.clear()
+
+    def start(self):
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Spotify Web API for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--playlist-size", type=int, default=200,
+                        help="Tracks per playlist unless the ID ends in size<N> (default: 200)")
+    parser.add_argument("--library-size", type=int, default=2000,
+                        help="Saved tracks in /v1/me/tracks (default: 2000)")
+    parser.add_argument("--page-size-cap", type=int, default=100,
+                        help="Largest page served, whatever the client asks for (default: 100)")
+    parser.add_argument("--latency", type=float, default=0, help="Milliseconds added to every API response")
+    parser.add_argument("--jitter", type=float, default=0, help="Random extra milliseconds (0 to this)")
+    parser.add_argument("--throttle-every", type=int, default=0,
+                        help="Start a 429 burst every N requests (0 = never)")
+    parser.add_argument("--throttle-burst", type=int, default=1, help="429 responses per burst")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated data and faults")
+    args = parser.parse_args(argv)
+
+    server = FakeSpotifyServer(
+        args.host, args.port,
+        catalog=FakeCatalog(args.playlist_size, args.library_size, args.seed),
+        faults=FaultInjector(args.latency, args.jitter, args.throttle_every, args.throttle_burst,
+                             args.retry_after, args.error_rate, args.seed),
+        page_size_cap=args.page_size_cap,
+    )
+    print(f"Fake Spotify API on {server.api_url} (stats: {server.base_url}/__stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats(), indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
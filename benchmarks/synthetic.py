@@ -0,0 +1,86 @@
+"""Deterministic synthetic Spotify data for offline benchmarks and load tests."""
+
+import random
+import string
+from song import Deck, song_from_track
+
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+_WORDS = (
+    "love", "night", "heart", "fire", "dance", "summer", "dream", "blue", "forever",
+    "Beyoncé", "Motörhead", "Sigur Rós", "Mañana", "Straße", "Ça va", "Zoë", "Ångström",
+    "Café", "Jalapeño", "Übermensch", "Déjà vu", "東京", "Привет", "🔥",
+)
+_NAMES = (
+    "The Midnight", "Daft Punk", "Björk", "Röyksopp", "Sinéad O'Connor", "Mötley Crüe",
+    "Beyoncé", "Ólafur Arnalds", "Los Tigres del Norte", "Café Tacvba", "DJ Snake",
+    "Earth, Wind & Fire", "Florence + The Machine", "Jürgen", "Ñengo Flow",
+)
+
+
+def _track_id(rng):
+    return ''.join(rng.choice(_ID_ALPHABET) for _ in range(22))
+
+
+def _title(rng):
+    kind = rng.random()
+    if kind < 0.15:
+        # Long enough (> 50 characters) to be ellipsized instead of wrapped
+        words = rng.choices(_WORDS, k=rng.randint(10, 16))
+        return ' '.join(words).capitalize() + " (Remastered 2011 Deluxe Edition)"
+    if kind < 0.5:
+        return ' '.join(rng.choices(_WORDS, k=rng.randint(3, 6))).title()
+    return ' '.join(rng.choices(_WORDS, k=rng.randint(1, 2))).title()
+
+
+def synthetic_track(rng):
+    """
+    One Web API track object with the fields the client requests.
+
+    Args:
+        rng: random.Random to draw from
+
+    Returns:
+        Track dict
+    """
+    track_id = _track_id(rng)
+    # Mostly one or two artists, sometimes a long feature list
+    artist_count = rng.choice((1, 1, 1, 2, 2, 3, 5, 8))
+    year = rng.randint(1950, 2025)
+    return {
+        'id': track_id,
+        'name': _title(rng),
+        'popularity': rng.randint(0, 100),
+        'artists': [{'name': name} for name in rng.sample(_NAMES, artist_count)],
+        'album': {'name': _title(rng), 'release_date': f"{year}-{rng.randint(1, 12):02d}-01"},
+        'external_urls': {'spotify': f"https://open.spotify.com/track/{track_id}"},
+    }
+
+
+def synthetic_tracks(count, seed=0):
+    """
+    Args:
+        count: Number of tracks
+        seed: Random seed (the same seed always gives the same tracks)
+
+    Returns:
+        List of track dicts
+    """
+    rng = random.Random(seed)
+    return [synthetic_track(rng) for _ in range(count)]
+
+
+def synthetic_deck(count, seed=0):
+    """
+    Args:
+        count: Number of songs
+        seed: Random seed
+
+    Returns:
+        Deck of Songs spread over four players
+    """
+    return Deck(
+        song_from_track(track)._replace(playlist_owner=f"Player {i % 4 + 1}")
+        for i, track in enumerate(synthetic_tracks(count, seed))
+    )
@@ -1,23 +1,76 @@
 """Configuration settings for the Spotify playlist game."""
 
 import os
-from dotenv import load_dotenv
+from functools import lru_cache
 
-# Load environment variables
-load_dotenv()
 
-# Spotify API credentials
-SPOTIFY_CLIENT_ID = os.getenv('SPOTIFY_CLIENT_ID')
-SPOTIFY_CLIENT_SECRET = os.getenv('SPOTIFY_CLIENT_SECRET')
+# Spotify API credentials, read from the environment / .env file the first time
+# config.SPOTIFY_CLIENT_ID or config.SPOTIFY_CLIENT_SECRET is used
+_ENVIRONMENT_SETTINGS = ('SPOTIFY_CLIENT_ID', 'SPOTIFY_CLIENT_SECRET')
+
+
+@lru_cache(maxsize=None)
+def _environment():
+    from dotenv import load_dotenv
+    load_dotenv()
+    return {name: os.getenv(name) for name in _ENVIRONMENT_SETTINGS}
+
+
+def __getattr__(name):
+    if name in _ENVIRONMENT_SETTINGS:
+        return _environment()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Game settings
 SONGS_PER_PLAYLIST = 10  # Default number of songs to fetch per playlist
 MIN_TRACK_POPULARITY = 0  # Minimum popularity score (0-100). Higher = more popular/views
-QR_SIZE = 200  # QR code size in pixels
+QR_SIZE = 200  # QR code size in pixels (only used by the "image" QR render mode)
+QR_RENDER_MODE = "vector"  # "vector" draws modules as PDF paths, "image" embeds a PNG
+QR_PAYLOAD = "canonical"  # "canonical" track URL without query, "uri" spotify:track:<id>, or "url" as-is
+QR_CACHE_SIZE = 4096  # QR module matrices kept in memory (keyed by URL)
+QR_CACHE_DIR = None  # Directory to also keep QR matrices between runs, e.g. ".qr_cache"
+SAMPLE_PLAYLISTS = False  # Pick random songs from the whole playlist instead of the first N
+SAMPLE_SEED = None  # Set to an int to get the same random picks every run
+DUPLICATE_SONGS = "keep"  # "keep" or "drop" tracks that appear in several playlists
 CARDS_PER_PAGE = 6  # Number of cards per page (2x3 grid)
 
+# Spotify endpoints (None = the real service); point these at a local fake
+# server such as benchmarks/fake_spotify.py for load tests
+SPOTIFY_API_URL = None  # Web API base, e.g. "http://127.0.0.1:8765/v1/"
+SPOTIFY_ACCOUNTS_URL = None  # Accounts service (token endpoint), e.g. "http://127.0.0.1:8765"
+
+# API request settings
+MAX_CONCURRENT_REQUESTS = 8  # Maximum Spotify API requests in flight at once
+REQUESTS_PER_SECOND = 10  # Sustained request rate shared by all fetch threads
+MAX_RATE_LIMIT_RETRIES = 5  # Retries after a 429 (waits for Retry-After each time)
+PARALLEL_LIBRARY_FETCH = True  # Fetch liked-songs pages by offset concurrently instead of via `next` links
+
+PIPELINE_QUEUE_SIZE = 60  # Songs buffered between the fetch and render stages
+BATCH_WORKERS = 4  # Decks fetched and rendered at the same time by batch.py
+
+# Deck rendering service (server.py)
+SERVER_HOST = "127.0.0.1"  # Interface to listen on
+SERVER_PORT = 8080  # Port to listen on
+SERVER_WORKERS = 4  # Render processes, also the number of decks served at once; more requests wait
+SERVER_QUEUE_TIMEOUT = 30  # Seconds a request waits for a worker before getting 503
+
+# Track metadata cache (set TRACK_CACHE_PATH to None to disable)
+TRACK_CACHE_PATH = ".track_cache.sqlite"  # SQLite file in the project directory
+TRACK_CACHE_TTL = 7 * 24 * 3600  # Seconds before a cached track is fetched again
+TRACK_CACHE_MAX_ENTRIES = 100000  # Least recently used tracks are evicted beyond this
+PLAYLIST_SNAPSHOT_CACHE = True  # Skip re-fetching playlists whose snapshot_id is unchanged
+
+# Liked songs library index (set LIBRARY_INDEX_PATH to None to scan the library every run)
+LIBRARY_INDEX_PATH = ".library_index.sqlite"  # SQLite file in the project directory
+LIBRARY_FULL_SYNC_INTERVAL = 7 * 24 * 3600  # Seconds between full syncs (refresh popularity, drop un-liked)
+
 # PDF settings
 PAGE_WIDTH = 612  # Letter size in points (8.5 inches)
 PAGE_HEIGHT = 792  # Letter size in points (11 inches)
 MARGIN = 18  # 0.25 inch margin (tighter to save space)
+TEXT_LAYOUT_CACHE_SIZE = 20000  # Wrapped title/artist layouts memoized per generator
+RENDER_WORKERS = 1  # Processes rendering pages in parallel (0 = one per CPU core)
+RENDER_CHUNK_PAGES = 8  # Page pairs (front + back) rendered per worker task
+PAGE_CACHE_DIR = None  # e.g. ".page_cache" to keep rendered page pairs, so rebuilds only re-render changed pages
+PAGE_CACHE_MAX_ENTRIES = 5000  # Page pairs kept in PAGE_CACHE_DIR; least recently used go first
 
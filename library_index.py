@@ -0,0 +1,146 @@
+"""Local SQLite index of the user's saved (liked) tracks."""
+
+import sqlite3
+import threading
+import time
+import config
+from song import Deck, Song
+
+
+_COLUMNS = ('title', 'artists', 'year', 'url', 'id', 'popularity', 'album')
+
+
+class LibraryIndex:
+    """Saved tracks with their added_at time, queryable without the network."""
+
+    def __init__(self, path: str = None):
+        """
+        Open (or create) the index database.
+
+        Args:
+            path: SQLite file to store the index in (default: config.LIBRARY_INDEX_PATH)
+        """
+        self.path = path or config.LIBRARY_INDEX_PATH
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS saved_tracks ("
+                "id TEXT PRIMARY KEY, added_at TEXT NOT NULL, title TEXT NOT NULL, "
+                "artists TEXT NOT NULL, year TEXT NOT NULL, url TEXT NOT NULL, "
+                "popularity INTEGER NOT NULL, album TEXT NOT NULL, synced_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS saved_tracks_popularity "
+                "ON saved_tracks (popularity, added_at)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value REAL NOT NULL)"
+            )
+
+    def contains(self, track_id: str, added_at: str) -> bool:
+        """
+        Args:
+            track_id: Spotify track ID
+            added_at: When the track was saved (ISO timestamp from the API)
+
+        Returns:
+            True if this exact save is already indexed
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM saved_tracks WHERE id = ? AND added_at = ?",
+                (track_id, added_at)
+            ).fetchone()
+        return row is not None
+
+    def add_many(self, saved: list, synced_at: float = None):
+        """
+        Insert or refresh saved tracks.
+
+        Args:
+            saved: List of (added_at, Song) pairs
+            synced_at: Sync time to stamp the rows with (default: now)
+        """
+        synced_at = synced_at or time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO saved_tracks "
+                "(id, added_at, title, artists, year, url, popularity, album, synced_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(song.id, added_at, song.title, song.artists, song.year, song.url,
+                  song.popularity, song.album, synced_at) for added_at, song in saved]
+            )
+
+    def remove_not_synced_since(self, synced_at: float) -> int:
+        """
+        Drop tracks a full sync did not see (they were un-liked).
+
+        Args:
+            synced_at: Start time of the full sync
+
+        Returns:
+            Number of tracks removed
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM saved_tracks WHERE synced_at < ?", (synced_at,)
+            ).rowcount
+
+    def get_state(self, key: str, default: float = None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sync_state WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key: str, value: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def query(self, min_popularity: int = 0) -> Deck:
+        """
+        Saved tracks at or above a popularity threshold, newest first.
+
+        Args:
+            min_popularity: Minimum popularity score (0-100)
+
+        Returns:
+            Deck of Songs
+        """
+        return Deck(song for _, batch in self.iter_query(min_popularity) for song in batch)
+
+    def iter_query(self, min_popularity: int = 0, offset: int = 0, batch_size: int = 500):
+        """
+        Stream a popularity query in batches, newest saves first.
+
+        Args:
+            min_popularity: Minimum popularity score (0-100)
+            offset: Number of matching tracks to skip (to resume an export)
+            batch_size: Rows fetched per batch
+
+        Yields:
+            (offset of the next batch, list of Songs)
+        """
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM saved_tracks "
+                    "WHERE popularity >= ? ORDER BY added_at DESC, id LIMIT ? OFFSET ?",
+                    (min_popularity, batch_size, offset)
+                ).fetchall()
+            if not rows:
+                return
+            offset += len(rows)
+            yield offset, [Song(*row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM saved_tracks").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -7,85 +7,341 @@ Standalone script to filter your Spotify liked songs by popularity.
 Usage:
     python filter_liked_songs.py                           # Print to console (popularity >= 80)
     python filter_liked_songs.py --output liked.csv        # Save to CSV
+    python filter_liked_songs.py --output liked.jsonl      # Save as JSON lines
     python filter_liked_songs.py --popularity 90 --output liked.csv  # Custom threshold
+    python filter_liked_songs.py --full-sync                # Re-read the whole library
+    python filter_liked_songs.py --profile prof.json       # Stage timings (--profile-format chrome for a trace)
 
 Note: Popularity is Spotify's 0-100 metric roughly correlated with streams.
       ~80+ = very popular tracks (>200M streams equivalent)
 """
 
 import csv
+import json
+import os
 import sys
-from spotipy import Spotify
-from spotipy.oauth2 import SpotifyOAuth
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import config
+import metrics
+from library_index import LibraryIndex
+from rate_limiter import RateLimiter, SERVER_ERROR_CODES, route_throttling_to_limiter
+from song import Deck, song_from_track
+from track_cache import TrackCache
+
+
+SAVED_TRACKS_PAGE_SIZE = 50  # Maximum the saved-tracks endpoint allows
+
+# Exported CSV header (kept stable for existing spreadsheets and scripts)
+CSV_COLUMNS = ["name", "artist", "album", "year", "popularity", "url"]
+
+
+def _song_row(song):
+    return (song.title, song.artists, song.album, song.year, song.popularity, song.url)
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(path, checkpoint):
+    # Write-then-rename, so a crash never leaves a torn checkpoint behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
 
 
 class LikedSongsFilter:
-    def __init__(self, popularity_threshold=80):
+    def __init__(self, popularity_threshold=80, sp=None):
         """
         Initialize the liked songs filter.
         
         Args:
             popularity_threshold: Minimum popularity score (0-100).
                                  ~80+ = very popular (>200M streams equivalent)
+            sp: Preconfigured spotipy.Spotify with a user token to use instead of
+                the browser login (e.g. pointed at a test server)
         """
+        self.sp = sp or self._create_spotify()
+        metrics.instrument_session(self.sp)
+        route_throttling_to_limiter(self.sp)
+        self.rate_limiter = RateLimiter()
+        self.popularity_threshold = popularity_threshold
+        self.track_cache = TrackCache() if config.TRACK_CACHE_PATH else None
+        self.library_index = LibraryIndex() if config.LIBRARY_INDEX_PATH else None
+    
+    @staticmethod
+    def _create_spotify():
         if not config.SPOTIFY_CLIENT_ID or not config.SPOTIFY_CLIENT_SECRET:
             raise ValueError(
                 "Spotify credentials not found. Set SPOTIFY_CLIENT_ID "
                 "and SPOTIFY_CLIENT_SECRET in .env file"
             )
         
-        self.sp = Spotify(
-            auth_manager=SpotifyOAuth(
-                scope="user-library-read",
-                client_id=config.SPOTIFY_CLIENT_ID,
-                client_secret=config.SPOTIFY_CLIENT_SECRET,
-                redirect_uri="http://127.0.0.1:8888",
-                cache_path=".spotify_cache"
-            )
+        from spotipy import Spotify
+        from spotipy.oauth2 import SpotifyOAuth
+        
+        auth = SpotifyOAuth(
+            scope="user-library-read",
+            client_id=config.SPOTIFY_CLIENT_ID,
+            client_secret=config.SPOTIFY_CLIENT_SECRET,
+            redirect_uri="http://127.0.0.1:8888",
+            cache_path=".spotify_cache"
         )
-        self.popularity_threshold = popularity_threshold
+        if config.SPOTIFY_ACCOUNTS_URL:
+            accounts_url = config.SPOTIFY_ACCOUNTS_URL.rstrip("/")
+            auth.OAUTH_AUTHORIZE_URL = accounts_url + "/authorize"
+            auth.OAUTH_TOKEN_URL = accounts_url + "/api/token"
+        
+        sp = Spotify(auth_manager=auth, status_forcelist=SERVER_ERROR_CODES)
+        if config.SPOTIFY_API_URL:
+            sp.prefix = config.SPOTIFY_API_URL
+        return sp
+    
+    def _saved_page(self, offset):
+        """Fetch one page of saved tracks as (added_at, Song) pairs, plus the raw results."""
+        with metrics.span("fetch saved page", "fetch", offset=offset):
+            results = self.rate_limiter.call(
+                self.sp.current_user_saved_tracks, limit=SAVED_TRACKS_PAGE_SIZE, offset=offset
+            )
+        saved = [(item["added_at"], song_from_track(item["track"])) for item in results["items"]
+                 if item["track"] and item["track"].get("id")]
+        
+        # The saved-tracks endpoint always returns full tracks, so keep them
+        # for playlist fetches that can then skip the metadata lookups
+        if self.track_cache:
+            self.track_cache.put_many([song for _, song in saved])
+        
+        return saved, results
+    
+    def _iter_saved_pages(self, parallel=None, start_offset=0):
+        """
+        Yield pages of (added_at, Song) pairs in library order (newest saves first).
+        Page i covers the library from start_offset + i * SAVED_TRACKS_PAGE_SIZE.
+        
+        In parallel mode the first page gives the library size, and the
+        remaining pages are fetched by offset on a bounded thread pool
+        (config.MAX_CONCURRENT_REQUESTS) through the shared rate limiter,
+        which retries 429s; pages are still yielded in order. Otherwise the
+        `next` links are followed one request at a time, which is cheaper
+        when the caller stops early.
+        
+        Args:
+            parallel: Fetch pages concurrently (default: config.PARALLEL_LIBRARY_FETCH)
+            start_offset: Library offset to start at
+        """
+        parallel = config.PARALLEL_LIBRARY_FETCH if parallel is None else parallel
+        saved, results = self._saved_page(start_offset)
+        yield saved
+        
+        if not parallel:
+            offset = start_offset
+            while results["next"]:
+                offset += SAVED_TRACKS_PAGE_SIZE
+                saved, results = self._saved_page(offset)
+                yield saved
+            return
+        
+        offsets = range(start_offset + SAVED_TRACKS_PAGE_SIZE, results["total"], SAVED_TRACKS_PAGE_SIZE)
+        workers = self.rate_limiter.max_in_flight
+        
+        # Keep a bounded window of pages in flight so a consumer that stops
+        # early (or writes as it goes) doesn't buffer the whole library
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            try:
+                for offset in offsets:
+                    pending.append(pool.submit(self._saved_page, offset))
+                    if len(pending) >= workers * 2:
+                        yield pending.popleft().result()[0]
+                while pending:
+                    yield pending.popleft().result()[0]
+            finally:
+                for future in pending:
+                    future.cancel()
+    
+    def sync_library(self, full=False):
+        """
+        Bring the local library index up to date with the user's saved tracks.
+        
+        Saved tracks come newest first, so an incremental sync stops at the
+        first page that reaches an already indexed save. A full sync re-reads
+        everything, refreshing popularity and dropping un-liked tracks; it
+        also runs when the last one is older than config.LIBRARY_FULL_SYNC_INTERVAL.
+        
+        Args:
+            full: Force a full sync
+        
+        Returns:
+            Number of saves added or refreshed
+        """
+        index = self.library_index
+        last_full_sync = index.get_state("last_full_sync", 0)
+        full = full or time.time() - last_full_sync > config.LIBRARY_FULL_SYNC_INTERVAL
+        
+        sync_started = time.time()
+        synced = 0
+        
+        print(f"Syncing liked songs ({'full' if full else 'incremental'})...")
+        
+        # An incremental sync usually stops after a page or two, so only a
+        # full sync is worth fetching in parallel
+        for saved in self._iter_saved_pages(parallel=None if full else False):
+            if not full:
+                known = [index.contains(song.id, added_at) for added_at, song in saved]
+                if any(known):
+                    saved = saved[:known.index(True)]
+                    index.add_many(saved, sync_started)
+                    synced += len(saved)
+                    break
+            
+            index.add_many(saved, sync_started)
+            synced += len(saved)
+        
+        if full:
+            removed = index.remove_not_synced_since(sync_started)
+            index.set_state("last_full_sync", sync_started)
+            if removed:
+                print(f"  Removed {removed} songs no longer liked")
+        
+        print(f"  {synced} songs synced, {index.count()} in library index")
+        return synced
     
-    def get_filtered_liked_songs(self):
+    def get_filtered_liked_songs(self, full_sync=False):
         """
         Fetch all liked songs and filter by popularity threshold.
         
+        With the library index enabled, only new saves are fetched and the
+        filter runs as a local query.
+        
+        Args:
+            full_sync: Re-read the whole library instead of syncing incrementally
+        
         Returns:
-            List of dicts with keys: name, artist, album, popularity, url, year
+            Deck of Songs (title, artists, album, year, popularity, url, id)
+        """
+        if self.library_index:
+            self.sync_library(full=full_sync)
+            return self.library_index.query(self.popularity_threshold)
+        
+        return Deck(self.iter_filtered_liked_songs())
+    
+    def iter_filtered_pages(self, start_offset=0, full_sync=False):
+        """
+        Stream liked songs that pass the popularity threshold, page by page.
+        
+        With the library index enabled the index is synced first (skipped
+        when resuming, so offsets stay stable) and pages come from a local
+        query; otherwise they come straight from the saved-tracks endpoint.
+        
+        Args:
+            start_offset: Offset to resume from (as yielded by an earlier run)
+            full_sync: Re-read the whole library before querying the index
+        
+        Yields:
+            (offset to resume from after this page, list of Songs)
         """
-        liked = []
-        results = self.sp.current_user_saved_tracks(limit=50)
+        if self.library_index:
+            if not start_offset:
+                self.sync_library(full=full_sync)
+            yield from self.library_index.iter_query(self.popularity_threshold, start_offset)
+            return
         
         print(f"Fetching liked songs (popularity >= {self.popularity_threshold})...")
         
-        while results:
-            for item in results["items"]:
-                track = item["track"]
-                if track and track["popularity"] >= self.popularity_threshold:
-                    artists = ", ".join([a["name"] for a in track["artists"]])
-                    release_date = track["album"]["release_date"]
-                    year = release_date.split("-")[0] if release_date else "Unknown"
-                    
-                    liked.append({
-                        "name": track["name"],
-                        "artist": artists,
-                        "album": track["album"]["name"],
-                        "popularity": track["popularity"],
-                        "url": track["external_urls"]["spotify"],
-                        "year": year
-                    })
-            
-            # Pagination
-            results = self.sp.next(results) if results["next"] else None
+        offset = start_offset
+        for saved in self._iter_saved_pages(start_offset=start_offset):
+            offset += SAVED_TRACKS_PAGE_SIZE
+            yield offset, [song for _, song in saved if song.popularity >= self.popularity_threshold]
+    
+    def iter_filtered_liked_songs(self, start_offset=0, full_sync=False):
+        """
+        Generator version of get_filtered_liked_songs.
         
-        return liked
+        Args:
+            start_offset: Offset to resume from (see iter_filtered_pages)
+            full_sync: Re-read the whole library before querying the index
+        
+        Yields:
+            Songs, in library order
+        """
+        for _, songs in self.iter_filtered_pages(start_offset, full_sync):
+            yield from songs
+    
+    def export_liked_songs(self, filename, full_sync=False):
+        """
+        Stream filtered liked songs to a CSV or JSONL (.jsonl) file.
+        
+        Rows are flushed after every page and a checkpoint with the next
+        offset is kept in `<filename>.checkpoint`. Re-running after a crash
+        or interrupt resumes from the checkpoint (dropping any partial rows
+        written after it); the checkpoint is removed once the export completes.
+        
+        Args:
+            filename: Output file; .jsonl writes one JSON object per line, anything else CSV
+            full_sync: Re-read the whole library before querying the index
+        
+        Returns:
+            Number of songs in the finished file
+        """
+        checkpoint_path = filename + ".checkpoint"
+        jsonl = filename.endswith(".jsonl")
+        source = "index" if self.library_index else "library"
+        
+        checkpoint = _read_checkpoint(checkpoint_path)
+        if (checkpoint and os.path.exists(filename)
+                and checkpoint["popularity"] == self.popularity_threshold
+                and checkpoint["source"] == source):
+            start_offset, written = checkpoint["offset"], checkpoint["songs"]
+            f = open(filename, "r+", newline="", encoding="utf-8")
+            f.truncate(checkpoint["bytes"])
+            f.seek(0, os.SEEK_END)
+            print(f"Resuming export to {filename} ({written} songs already written)...")
+        else:
+            start_offset = written = 0
+            f = open(filename, "w", newline="", encoding="utf-8")
+            if not jsonl:
+                csv.writer(f).writerow(CSV_COLUMNS)
+        
+        with f:
+            writer = csv.writer(f)
+            for next_offset, songs in self.iter_filtered_pages(start_offset, full_sync):
+                if jsonl:
+                    f.writelines(
+                        json.dumps(dict(zip(CSV_COLUMNS, _song_row(song))), ensure_ascii=False) + "\n"
+                        for song in songs
+                    )
+                else:
+                    writer.writerows(_song_row(song) for song in songs)
+                f.flush()
+                written += len(songs)
+                
+                _write_checkpoint(checkpoint_path, {
+                    "offset": next_offset,
+                    "songs": written,
+                    "bytes": os.fstat(f.fileno()).st_size,
+                    "popularity": self.popularity_threshold,
+                    "source": source,
+                })
+        
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        
+        print(f"\n✓ Saved {written} songs to {filename}")
+        return written
     
     def save_to_csv(self, songs, filename="liked_songs_filtered.csv"):
         """
         Save filtered songs to a CSV file.
         
         Args:
-            songs: List of song dictionaries
+            songs: Songs to save
             filename: Output CSV filename
         """
         if not songs:
@@ -93,9 +349,9 @@ class LikedSongsFilter:
             return
         
         with open(filename, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=["name", "artist", "album", "year", "popularity", "url"])
-            writer.writeheader()
-            writer.writerows(songs)
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            writer.writerows(_song_row(song) for song in songs)
         
         print(f"\n✓ Saved {len(songs)} songs to {filename}")
 
@@ -106,6 +362,9 @@ def main():
         # Parse command line arguments
         popularity_threshold = 80  # Default
         output_file = None
+        full_sync = False
+        profile_file = None
+        profile_format = "json"
         
         args = sys.argv[1:]
         i = 0
@@ -116,12 +375,36 @@ def main():
             elif args[i] == "--output" and i + 1 < len(args):
                 output_file = args[i + 1]
                 i += 2
+            elif args[i] == "--full-sync":
+                full_sync = True
+                i += 1
+            elif args[i] == "--profile" and i + 1 < len(args):
+                profile_file = args[i + 1]
+                i += 2
+            elif args[i] == "--profile-format" and i + 1 < len(args):
+                profile_format = args[i + 1]
+                i += 2
             else:
                 i += 1
         
-        # Fetch and filter songs
+        if profile_file:
+            metrics.enable()
+        
         filter_client = LikedSongsFilter(popularity_threshold=popularity_threshold)
-        songs = filter_client.get_filtered_liked_songs()
+        
+        # Stream straight to the file (resumable) when an output file is given
+        if output_file:
+            count = filter_client.export_liked_songs(output_file, full_sync=full_sync)
+            if not count:
+                print(f"\nNo liked songs found with popularity >= {popularity_threshold}")
+            if profile_file:
+                metrics.write_profile(profile_file, profile_format)
+            return count
+        
+        # Fetch and filter songs
+        songs = filter_client.get_filtered_liked_songs(full_sync=full_sync)
+        if profile_file:
+            metrics.write_profile(profile_file, profile_format)
         
         if not songs:
             print(f"\nNo liked songs found with popularity >= {popularity_threshold}")
@@ -129,24 +412,20 @@ def main():
         
         print(f"\n✓ Found {len(songs)} songs with popularity >= {popularity_threshold}")
         
-        # Save to CSV if output file specified
-        if output_file:
-            filter_client.save_to_csv(songs, output_file)
-        else:
-            # Print to console
-            print("\n" + "="*80)
-            print(f"{'ARTIST':<30} {'SONG':<35} {'POP':<5} {'YEAR':<5}")
-            print("="*80)
-            for track in songs:
-                artist = track["artist"][:28]
-                name = track["name"][:33]
-                print(f'{artist:<30} {name:<35} {track["popularity"]:<5} {track["year"]:<5}')
-            print("="*80)
+        # Print to console
+        print("\n" + "="*80)
+        print(f"{'ARTIST':<30} {'SONG':<35} {'POP':<5} {'YEAR':<5}")
+        print("="*80)
+        for track in songs:
+            artist = track.artists[:28]
+            name = track.title[:33]
+            print(f'{artist:<30} {name:<35} {track.popularity:<5} {track.year:<5}')
+        print("="*80)
         
         return songs
     
     except KeyboardInterrupt:
-        print("\n\nCancelled by user.")
+        print("\n\nCancelled by user. Re-run the same command to resume an export.")
         sys.exit(0)
     except Exception as e:
         print(f"\nERROR: {str(e)}")
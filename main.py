@@ -1,7 +1,18 @@
+"""
+Interactive card generator: prompts for playlists and writes a printable PDF.
+
+Usage:
+    python main.py                          # Writes game_cards.pdf
+    python main.py --output table3.pdf
+
+spotipy, reportlab and qrcode are only imported once they are needed, so
+--help and the credential check return immediately.
+"""
+
+import argparse
 import sys
-from spotify_client import SpotifyClient
-from pdf_generator import PDFGenerator
 import config
+import metrics
 
 
 def get_playlist_urls():
@@ -40,7 +51,22 @@ def get_songs_per_playlist():
         return default
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate printable game cards (QR fronts, song info backs) "
+                    "from one Spotify playlist per player."
+    )
+    parser.add_argument("--output", "-o", default="game_cards.pdf",
+                        help="PDF file to write (default: game_cards.pdf)")
+    metrics.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile:
+        metrics.enable()
+    
     try:
         if not config.SPOTIFY_CLIENT_ID or not config.SPOTIFY_CLIENT_SECRET:
             print("\nERROR: Spotify API credentials not found!")
@@ -60,26 +86,37 @@ def main():
         print(f"Total songs: {len(playlist_urls) * songs_per_playlist}")
         print(f"{'='*60}\n")
         
+        from itertools import chain
+        from pdf_generator import PDFGenerator
+        from pipeline import stream_in_background
+        from spotify_client import SpotifyClient
+        
         print("Connecting to Spotify...")
         spotify = SpotifyClient()
-        songs = spotify.get_multiple_playlists(playlist_urls, songs_per_playlist)
         
-        if not songs:
+        # Pages are rendered while later playlists are still being fetched
+        songs = stream_in_background(
+            spotify.iter_multiple_playlists(playlist_urls, songs_per_playlist)
+        )
+        
+        first_song = next(songs, None)
+        if first_song is None:
             print("\nERROR: No songs fetched. Check playlist URLs.")
             sys.exit(1)
         
-        print(f"\n✓ Fetched {len(songs)} songs")
-        
-        output_file = "game_cards.pdf"
+        output_file = args.output
         print(f"\nGenerating PDF: {output_file}")
         
         pdf_gen = PDFGenerator()
-        pdf_gen.generate_pdf(songs, output_file)
+        card_count = pdf_gen.generate_pdf(chain([first_song], songs), output_file)
         
         print("\n" + "="*60)
         print("✓ SUCCESS! Your game cards are ready!")
         print("="*60)
-        print(f"\nFile: {output_file} | Cards: {len(songs)}")
+        print(f"\nFile: {output_file} | Cards: {card_count}")
+        
+        if args.profile:
+            metrics.write_profile(args.profile, args.profile_format)
 
     except KeyboardInterrupt:
         print("\n\nCancelled by user.")
@@ -0,0 +1,220 @@
+"""Stage timing spans and counters, exportable as JSON or a Chrome trace.
+
+Everything is off until enable() is called; while off, span() hands back a
+shared no-op context manager and count() returns immediately, so
+instrumented hot paths cost one function call.
+
+Spans recorded in render worker processes (RENDER_WORKERS > 1) stay in those
+processes; the parent still records the chunk it waited for.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+
+_enabled = False
+_lock = threading.Lock()
+_spans = []  # (name, category, start_ns, duration_ns, thread_id, args)
+_counters = Counter()
+_origin_ns = time.perf_counter_ns()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'category', 'args', 'start')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter_ns() - self.start
+        with _lock:
+            _spans.append((self.name, self.category, self.start, duration,
+                           threading.get_ident(), self.args))
+        return False
+
+
+def enable():
+    """Start recording (clears anything recorded before)."""
+    global _enabled, _origin_ns
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _origin_ns = time.perf_counter_ns()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, category: str = "app", **args):
+    """
+    Time a block of code.
+
+    Example:
+        with metrics.span("fetch page", "fetch", offset=100):
+            ...
+
+    Args:
+        name: Stage name (spans with the same name are aggregated)
+        category: Group shown in trace viewers, e.g. "fetch" or "render"
+        **args: Extra details stored with this span in the trace
+
+    Returns:
+        Context manager (a shared no-op one while disabled)
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+def count(name: str, value: int = 1):
+    """
+    Add to a counter, e.g. count("api.bytes", len(body)).
+    """
+    if _enabled:
+        with _lock:
+            _counters[name] += value
+
+
+def instrument_session(sp):
+    """
+    Count API requests, response bytes and status codes of a spotipy client.
+
+    Hooks the client's requests session, so retried and paginated calls are
+    all seen. Safe to call on clients without a session.
+
+    Args:
+        sp: spotipy.Spotify instance
+    """
+    session = getattr(sp, '_session', None)
+    if session is None or not hasattr(session, 'hooks'):
+        return
+
+    def on_response(response, *args, **kwargs):
+        if _enabled:
+            count("api.requests")
+            count(f"api.status.{response.status_code}")
+            count("api.bytes", len(response.content))
+
+    session.hooks.setdefault('response', []).append(on_response)
+
+
+def summary() -> dict:
+    """
+    Returns:
+        Dict with "spans" (per name: count, total_ms, mean_ms, max_ms, category)
+        and "counters"
+    """
+    with _lock:
+        spans = list(_spans)
+        counters = dict(_counters)
+
+    stages = {}
+    for name, category, _, duration, _, _ in spans:
+        stage = stages.setdefault(name, {'category': category, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        ms = duration / 1e6
+        stage['count'] += 1
+        stage['total_ms'] += ms
+        stage['max_ms'] = max(stage['max_ms'], ms)
+
+    for stage in stages.values():
+        stage['mean_ms'] = round(stage['total_ms'] / stage['count'], 3)
+        stage['total_ms'] = round(stage['total_ms'], 3)
+        stage['max_ms'] = round(stage['max_ms'], 3)
+
+    return {'spans': stages, 'counters': counters}
+
+
+def chrome_trace() -> dict:
+    """
+    Returns:
+        Trace in Chrome's Trace Event Format (open in chrome://tracing or Perfetto)
+    """
+    pid = os.getpid()
+    with _lock:
+        spans = list(_spans)
+        counters = dict(_counters)
+        origin = _origin_ns
+
+    events = [{
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': (start - origin) / 1000,
+        'dur': duration / 1000,
+        'pid': pid,
+        'tid': thread_id,
+        'args': args,
+    } for name, category, start, duration, thread_id, args in spans]
+
+    return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'counters': counters}}
+
+
+def export(path: str, format: str = "json"):
+    """
+    Write what was recorded to a file.
+
+    Args:
+        path: Output file
+        format: "json" for the per-stage summary, "chrome" for a trace
+    """
+    if format not in ("json", "chrome"):
+        raise ValueError(f"Unknown profile format: {format!r} (use 'json' or 'chrome')")
+
+    data = chrome_trace() if format == "chrome" else summary()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=None if format == "chrome" else 2)
+
+
+def print_summary():
+    """Print a per-stage timing table and the counters."""
+    data = summary()
+    print(f"\n{'stage':<24} {'count':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}")
+    for name, stage in sorted(data['spans'].items(), key=lambda item: -item[1]['total_ms']):
+        print(f"{name:<24} {stage['count']:>7} {stage['total_ms']:>10.1f}"
+              f" {stage['mean_ms']:>9.3f} {stage['max_ms']:>9.3f}")
+    for name, value in sorted(data['counters'].items()):
+        print(f"{name:<24} {value:>7}")
+
+
+def write_profile(path: str, format: str = "json"):
+    """Export to a file and print the summary (the end of a --profile run)."""
+    export(path, format)
+    print_summary()
+    print(f"\nProfile written to {path} ({format})")
+
+
+def add_profile_arguments(parser):
+    """Add --profile/--profile-format to an argparse parser."""
+    parser.add_argument("--profile", metavar="FILE", default=None,
+                        help="Record stage timings and counters and write them to FILE")
+    parser.add_argument("--profile-format", choices=("json", "chrome"), default="json",
+                        help="json: per-stage summary; chrome: trace for chrome://tracing (default: json)")
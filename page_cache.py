@@ -0,0 +1,113 @@
+"""On-disk cache of rendered page pairs (QR front + info back) keyed by content."""
+
+import hashlib
+import json
+import os
+import threading
+import config
+import metrics
+
+
+def page_key(fingerprint: str, songs, payload) -> str:
+    """
+    Content hash of one page pair.
+
+    Only what the cards show is hashed, so fields that aren't drawn (e.g.
+    popularity, which changes between fetches) don't invalidate pages.
+
+    Args:
+        fingerprint: Everything besides the songs that changes the drawing
+                     (see PDFGenerator.layout_fingerprint)
+        songs: Songs of the page, in card order
+        payload: Maps a song URL to the text its QR code encodes
+                 (QRGenerator.payload), so e.g. ?si= query strings that
+                 are dropped from the code don't change the key
+
+    Returns:
+        Hex digest; equal keys render to identical pages
+    """
+    cards = [[song.title, song.artists, song.year, payload(song.url)] for song in songs]
+    data = json.dumps([fingerprint, cards], ensure_ascii=False)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class PageCache:
+    """Directory of page-pair PDFs with LRU eviction by file modification time."""
+
+    def __init__(self, cache_dir: str = None, max_entries: int = None):
+        """
+        Args:
+            cache_dir: Directory to keep the pages in (default: config.PAGE_CACHE_DIR)
+            max_entries: Page pairs kept; least recently used go first
+                         (default: config.PAGE_CACHE_MAX_ENTRIES)
+        """
+        self.cache_dir = cache_dir or config.PAGE_CACHE_DIR
+        self.max_entries = max_entries or config.PAGE_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.pdf')
+
+    def get(self, key: str):
+        """
+        Returns:
+            The cached PDF bytes, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Mark as recently used for prune()
+            os.utime(path)
+        except OSError:
+            data = None
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.count("page_cache.misses" if data is None else "page_cache.hits")
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def prune(self) -> int:
+        """
+        Delete the least recently used pages beyond max_entries.
+
+        Returns:
+            Number of pages deleted
+        """
+        with os.scandir(self.cache_dir) as it:
+            entries = [(entry.stat().st_mtime, entry.path) for entry in it if entry.name.endswith('.pdf')]
+        if len(entries) <= self.max_entries:
+            return 0
+
+        entries.sort()
+        removed = 0
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                # Already evicted by another process sharing the directory
+                pass
+        return removed
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            Dict with keys: hits, misses
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
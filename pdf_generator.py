@@ -1,18 +1,61 @@
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
+import hashlib
+import os
+import sys
+from collections import deque
 from io import BytesIO
+from itertools import islice
 import config
+import metrics
 from qr_generator import QRGenerator
+from text_layout import TextLayout
+
+
+CARD_CHROME_FORM = "card_chrome"
+
+
+def _year_gradient(year: int) -> tuple:
+    # Normalize to 0-1 range
+    normalized = (year - 1900) / (2025 - 1900)
+    
+    # Color gradient from dark blue (old) to dark red (new)
+    if normalized < 0.5:
+        # 1900-1962: Dark blue to purple
+        t = normalized * 2
+        r = 0.2 + (0.4 * t)  # 0.2 to 0.6
+        g = 0.0 + (0.1 * t)  # 0.0 to 0.1
+        b = 0.5 + (0.2 * t)  # 0.5 to 0.7
+    else:
+        # 1963-2025: Purple to dark red
+        t = (normalized - 0.5) * 2
+        r = 0.6 + (0.3 * t)  # 0.6 to 0.9
+        g = 0.1 - (0.1 * t)  # 0.1 to 0.0
+        b = 0.7 - (0.5 * t)  # 0.7 to 0.2
+    
+    return (r, g, b)
+
+
+# Precomputed year colors, looked up per info card
+YEAR_COLORS = {year: _year_gradient(year) for year in range(1900, 2026)}
 
 
 class PDFGenerator:
-    def __init__(self):
+    def __init__(self, page_cache_dir: str = None):
+        """
+        Args:
+            page_cache_dir: Directory caching rendered page pairs, so rebuilding
+                            a deck only re-renders the pages whose songs changed
+                            (default: config.PAGE_CACHE_DIR, None = no caching)
+        """
         self.qr_generator = QRGenerator()
+        self.text_layout = TextLayout()
         self.page_width = config.PAGE_WIDTH
         self.page_height = config.PAGE_HEIGHT
         self.margin = config.MARGIN
         self.cards_per_page = config.CARDS_PER_PAGE
+        self.qr_render_mode = config.QR_RENDER_MODE
         
         # Calculate card dimensions (2 columns x 3 rows)
         self.cols = 2
@@ -24,6 +67,10 @@ class PDFGenerator:
         self.corner_length = 12  # Length of corner marks in points
         self.border_line_width = 1.5  # Thicker lines for visibility
         self.corner_inset = 8  # Distance from edge to corner marks (makes them closer to card content)
+        
+        self.page_cache_dir = page_cache_dir or config.PAGE_CACHE_DIR
+        self._page_cache = None
+        self._layout_fingerprint = None
     
     def _get_card_position(self, card_index):
         col = card_index % self.cols
@@ -48,32 +95,14 @@ class PDFGenerator:
         except (ValueError, TypeError):
             return (0, 0, 0)
         
-        t = (year - 1900) / 125
-        
-        # Normalize to 0-1 range
-        normalized = (year - 1900) / (2025 - 1900)
-        
-        # Color gradient from dark blue (old) to dark red (new)
-        if normalized < 0.5:
-            # 1900-1962: Dark blue to purple
-            t = normalized * 2
-            r = 0.2 + (0.4 * t)  # 0.2 to 0.6
-            g = 0.0 + (0.1 * t)  # 0.0 to 0.1
-            b = 0.5 + (0.2 * t)  # 0.5 to 0.7
-        else:
-            # 1963-2025: Purple to dark red
-            t = (normalized - 0.5) * 2
-            r = 0.6 + (0.3 * t)  # 0.6 to 0.9
-            g = 0.1 - (0.1 * t)  # 0.1 to 0.0
-            b = 0.7 - (0.5 * t)  # 0.7 to 0.2
-        
-        return (r, g, b)
+        return YEAR_COLORS[year]
     
     def _wrap_text(self, c: canvas.Canvas, text: str, font_name: str, 
                    font_size: float, max_width: float) -> list:
         """
         Wrap text into multiple lines to fit within max width.
         If text is longer than 50 characters, ellipsizes instead of wrapping.
+        Layouts are memoized by the shared TextLayout engine.
         
         Args:
             c: ReportLab canvas
@@ -85,30 +114,7 @@ class PDFGenerator:
         Returns:
             List of text lines
         """
-        # If text is longer than 50 characters, ellipsize it
-        if len(text) > 50:
-            truncated = text
-            while c.stringWidth(truncated + "...", font_name, font_size) > max_width and len(truncated) > 10:
-                truncated = truncated[:-1]
-            return [truncated + "..."]
-        
-        words = text.split()
-        lines = []
-        current_line = []
-        
-        for word in words:
-            test_line = ' '.join(current_line + [word])
-            if c.stringWidth(test_line, font_name, font_size) <= max_width:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                current_line = [word]
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        
-        return lines or [text]
+        return self.text_layout.wrap(text, font_name, font_size, max_width)
     
     def _draw_corner_marks(self, c, x, y, w, h):
         c.setStrokeColorRGB(0.5, 0.5, 0.5)
@@ -118,20 +124,20 @@ class PDFGenerator:
         cl = self.corner_length
         
         # Bottom-left corner (inset from edges)
-        c.line(x + inset, y + inset, x + inset + self.corner_length, y + inset)  # Horizontal
-        c.line(x + inset, y + inset, x + inset, y + inset + self.corner_length)  # Vertical
+        c.line(x + i, y + i, x + i + cl, y + i)  # Horizontal
+        c.line(x + i, y + i, x + i, y + i + cl)  # Vertical
         
         # Bottom-right corner (inset from edges)
-        c.line(x + width - inset - self.corner_length, y + inset, x + width - inset, y + inset)  # Horizontal
-        c.line(x + width - inset, y + inset, x + width - inset, y + inset + self.corner_length)  # Vertical
+        c.line(x + w - i - cl, y + i, x + w - i, y + i)  # Horizontal
+        c.line(x + w - i, y + i, x + w - i, y + i + cl)  # Vertical
         
         # Top-left corner (inset from edges)
-        c.line(x + inset, y + height - inset - self.corner_length, x + inset, y + height - inset)  # Vertical
-        c.line(x + inset, y + height - inset, x + inset + self.corner_length, y + height - inset)  # Horizontal
+        c.line(x + i, y + h - i - cl, x + i, y + h - i)  # Vertical
+        c.line(x + i, y + h - i, x + i + cl, y + h - i)  # Horizontal
         
         # Top-right corner (inset from edges)
-        c.line(x + width - inset, y + height - inset - self.corner_length, x + width - inset, y + height - inset)  # Vertical
-        c.line(x + width - inset - self.corner_length, y + height - inset, x + width - inset, y + height - inset)  # Horizontal
+        c.line(x + w - i, y + h - i - cl, x + w - i, y + h - i)  # Vertical
+        c.line(x + w - i - cl, y + h - i, x + w - i, y + h - i)  # Horizontal
     
     def _draw_cutting_guides(self, c, x, y, w, h):
         c.setStrokeColorRGB(0.7, 0.7, 0.7)
@@ -148,24 +154,100 @@ class PDFGenerator:
         
         c.setDash()
     
+    def _new_canvas(self, target):
+        """
+        Create a canvas with the static card chrome (corner marks and cutting
+        guides) defined once as a form XObject, so each card only references it.
+        """
+        c = canvas.Canvas(target, pagesize=letter)
+        
+        c.beginForm(CARD_CHROME_FORM, lowerx=0, lowery=0,
+                    upperx=self.card_width, uppery=self.card_height)
+        self._draw_corner_marks(c, 0, 0, self.card_width, self.card_height)
+        self._draw_cutting_guides(c, 0, 0, self.card_width, self.card_height)
+        c.endForm()
+        
+        return c
+    
+    def _draw_card_chrome(self, c, x, y):
+        c.saveState()
+        c.translate(x, y)
+        c.doForm(CARD_CHROME_FORM)
+        c.restoreState()
+    
     def _draw_centered_lines(self, c, lines, center_x, start_y, font_name, font_size, line_height):
         for i, line in enumerate(lines):
-            line_width = c.stringWidth(line, font_name, font_size)
+            line_width = self.text_layout.string_width(line, font_name, font_size)
             c.drawString(center_x - line_width/2, start_y - i*line_height, line)
     
+    def _draw_qr_vector(self, c, matrix, x, y, size):
+        """
+        Draw a QR module matrix as filled rectangles on the canvas.
+        
+        Horizontal runs of dark modules are merged into a single rectangle
+        and all rectangles go into one path, so each QR code costs a single
+        fill operation instead of a raster image.
+        
+        Args:
+            c: ReportLab canvas
+            matrix: QR module matrix (rows of bools, top row first)
+            x: Left edge of the QR code in points
+            y: Bottom edge of the QR code in points
+            size: Width and height of the QR code in points
+        """
+        module = size / len(matrix)
+        path = c.beginPath()
+        
+        for row_index, row in enumerate(matrix):
+            row_y = y + size - (row_index + 1) * module
+            col = 0
+            while col < len(row):
+                if not row[col]:
+                    col += 1
+                    continue
+                run_start = col
+                while col < len(row) and row[col]:
+                    col += 1
+                path.rect(x + run_start * module, row_y, (col - run_start) * module, module)
+        
+        c.setFillColorRGB(0, 0, 0)
+        c.drawPath(path, stroke=0, fill=1)
+    
+    def _draw_qr_form(self, c, url, x, y, size):
+        """
+        Place the QR code for a URL, defining it as a form XObject the first
+        time the URL appears in the document, so duplicate songs reference
+        one embedded copy.
+        """
+        form_name = "qr_" + self.qr_generator.cache_key(url)
+        
+        if not c.hasForm(form_name):
+            matrix = self.qr_generator.generate_qr_matrix(url)
+            c.beginForm(form_name, lowerx=0, lowery=0, upperx=size, uppery=size)
+            self._draw_qr_vector(c, matrix, 0, 0, size)
+            c.endForm()
+        
+        c.saveState()
+        c.translate(x, y)
+        c.doForm(form_name)
+        c.restoreState()
+    
     def _draw_qr_card(self, c, song, card_index):
         x, y = self._get_card_position(card_index)
         
-        qr_bytes = self.qr_generator.generate_qr_bytes(song['url'])
-        qr_image = ImageReader(BytesIO(qr_bytes))
-        
         qr_size = min(self.card_width, self.card_height) * 0.85
         qr_x = x + (self.card_width - qr_size) / 2
         qr_y = y + (self.card_height - qr_size) / 2
         
-        c.drawImage(qr_image, qr_x, qr_y, width=qr_size, height=qr_size)
-        self._draw_corner_marks(c, x, y, self.card_width, self.card_height)
-        self._draw_cutting_guides(c, x, y, self.card_width, self.card_height)
+        if self.qr_render_mode == "vector":
+            self._draw_qr_form(c, song.url, qr_x, qr_y, qr_size)
+        else:
+            # reportlab embeds identical images once (keyed by content hash)
+            qr_bytes = self.qr_generator.generate_qr_bytes(song.url)
+            qr_image = ImageReader(BytesIO(qr_bytes))
+            c.drawImage(qr_image, qr_x, qr_y, width=qr_size, height=qr_size)
+        
+        self._draw_card_chrome(c, x, y)
     
     def _draw_info_card(self, c, song, card_index):
         x, y = self._get_card_position(card_index)
@@ -174,14 +256,14 @@ class PDFGenerator:
         max_width = self.card_width - 16
         
         # Year
-        year_color = self._get_year_color(song['year'])
+        year_color = self._get_year_color(song.year)
         c.setFillColorRGB(*year_color)
         c.setFont("Helvetica-Bold", 40)
-        year_width = c.stringWidth(song['year'], "Helvetica-Bold", 40)
-        c.drawString(center_x - year_width/2, center_y + 45, song['year'])
+        year_width = self.text_layout.string_width(song.year, "Helvetica-Bold", 40)
+        c.drawString(center_x - year_width/2, center_y + 45, song.year)
         
         # Title
-        title_lines = self._wrap_text(c, song['title'], "Helvetica-Bold", 20, max_width)
+        title_lines = self._wrap_text(c, song.title, "Helvetica-Bold", 20, max_width)
         c.setFillColorRGB(0, 0, 0)
         c.setFont("Helvetica-Bold", 20)
         
@@ -190,7 +272,7 @@ class PDFGenerator:
         self._draw_centered_lines(c, title_lines, center_x, title_start_y, "Helvetica-Bold", 20, line_height)
         
         # Artists
-        artist_lines = self._wrap_text(c, song['artists'], "Helvetica", 16, max_width)
+        artist_lines = self._wrap_text(c, song.artists, "Helvetica", 16, max_width)
         c.setFillColorRGB(0.2, 0.2, 0.2)
         c.setFont("Helvetica", 16)
         
@@ -198,39 +280,260 @@ class PDFGenerator:
         artist_start_y = center_y - 30 - ((len(artist_lines) - 1) * artist_line_height / 2)
         self._draw_centered_lines(c, artist_lines, center_x, artist_start_y, "Helvetica", 16, artist_line_height)
         
-        self._draw_corner_marks(c, x, y, self.card_width, self.card_height)
-        self._draw_cutting_guides(c, x, y, self.card_width, self.card_height)
+        self._draw_card_chrome(c, x, y)
+    
+    def _draw_qr_page(self, c, page_songs):
+        for i, song in enumerate(page_songs):
+            with metrics.span("draw qr card", "render"):
+                self._draw_qr_card(c, song, i)
+        with metrics.span("page flush", "render"):
+            c.showPage()
+    
+    def _draw_info_page(self, c, page_songs):
+        # Mirror columns so each info card lands behind its QR card
+        for i, song in enumerate(page_songs):
+            mirrored_i = (i // self.cols) * self.cols + (self.cols - 1 - (i % self.cols))
+            with metrics.span("draw info card", "render"):
+                self._draw_info_card(c, song, mirrored_i)
+        with metrics.span("page flush", "render"):
+            c.showPage()
     
-    def generate_pdf(self, songs, output_file):
-        c = canvas.Canvas(output_file, pagesize=letter)
+    def render_chunk(self, songs) -> bytes:
+        """
+        Render a run of songs to a standalone PDF, without progress output.
         
-        total_songs = len(songs)
-        total_pages = (total_songs + self.cards_per_page - 1) // self.cards_per_page * 2
+        The chunk starts on a new page, so chunks whose length is a multiple
+        of cards_per_page can be concatenated into the same deck that
+        generate_pdf would produce.
         
-        print(f"\nGenerating PDF with {total_songs} songs...")
-        print(f"Total pages: {total_pages} ({total_pages // 2} front, {total_pages // 2} back)")
+        Args:
+            songs: List (or Deck) of Songs
+            
+        Returns:
+            PDF file contents
+        """
+        buffer = BytesIO()
+        c = self._new_canvas(buffer)
+        
+        for start in range(0, len(songs), self.cards_per_page):
+            page_songs = songs[start:start + self.cards_per_page]
+            self._draw_qr_page(c, page_songs)
+            self._draw_info_page(c, page_songs)
         
-        for page_num in range(0, total_pages, 2):
-            page_index = page_num // 2
-            start_idx = page_index * self.cards_per_page
-            end_idx = min(start_idx + self.cards_per_page, total_songs)
-            page_songs = songs[start_idx:end_idx]
+        with metrics.span("pdf save", "render"):
+            c.save()
+        return buffer.getvalue()
+    
+    def layout_fingerprint(self) -> str:
+        """
+        Hash of everything besides the songs that affects how pages are drawn:
+        page geometry, QR settings and the source of the drawing modules, so
+        cached pages are never reused after a layout or code change.
+        """
+        if self._layout_fingerprint is None:
+            digest = hashlib.sha1(repr((
+                self.page_width, self.page_height, self.margin, self.cards_per_page,
+                self.qr_render_mode, self.qr_generator.qr_size, self.qr_generator.payload_mode,
+            )).encode('utf-8'))
+            for module_name in (__name__, QRGenerator.__module__, TextLayout.__module__):
+                with open(sys.modules[module_name].__file__, 'rb') as f:
+                    digest.update(f.read())
+            self._layout_fingerprint = digest.hexdigest()
+        return self._layout_fingerprint
+    
+    @property
+    def page_cache(self):
+        if self._page_cache is None and self.page_cache_dir:
+            from page_cache import PageCache
+            self._page_cache = PageCache(self.page_cache_dir)
+        return self._page_cache
+    
+    def _render_sequential(self, song_iter, output_file, total_pages):
+        c = self._new_canvas(output_file)
+        page_num = 0
+        card_count = 0
+        
+        while True:
+            page_songs = list(islice(song_iter, self.cards_per_page))
+            if not page_songs:
+                break
             
-            print(f"Creating page {page_num + 1}/{total_pages} (QR codes)...")
-            for i, song in enumerate(page_songs):
-                self._draw_qr_card(c, song, i)
-            c.showPage()
+            of_total = f"/{total_pages}" if total_pages else ""
             
-            print(f"Creating page {page_num + 2}/{total_pages} (song info)...")
-            for i, song in enumerate(page_songs):
-                mirrored_i = (i // self.cols) * self.cols + (self.cols - 1 - (i % self.cols))
-                self._draw_info_card(c, song, mirrored_i)
-            c.showPage()
+            print(f"Creating page {page_num + 1}{of_total} (QR codes)...")
+            self._draw_qr_page(c, page_songs)
+            
+            print(f"Creating page {page_num + 2}{of_total} (song info)...")
+            self._draw_info_page(c, page_songs)
+            
+            page_num += 2
+            card_count += len(page_songs)
+        
+        with metrics.span("pdf save", "render"):
+            c.save()
+        return card_count, page_num
+    
+    def _render_parallel(self, song_iter, output_file, workers):
+        from pypdf import PdfReader, PdfWriter
+        
+        chunk_size = self.cards_per_page * config.RENDER_CHUNK_PAGES
+        writer = PdfWriter()
+        pending = deque()
+        card_count = 0
+        
+        print(f"Rendering with {workers} worker processes...")
+        with _new_render_pool(workers) as pool:
+            while True:
+                # Keep a bounded number of chunks in flight so a streamed deck
+                # is never fully materialized
+                while len(pending) < workers * 2:
+                    chunk = list(islice(song_iter, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append((len(chunk), pool.submit(_render_chunk, chunk)))
+                
+                if not pending:
+                    break
+                
+                # Merge strictly in submission order to keep the deck order
+                chunk_len, future = pending.popleft()
+                with metrics.span("render chunk wait", "render", cards=chunk_len):
+                    chunk_pdf = future.result()
+                with metrics.span("pdf merge", "render"):
+                    writer.append(PdfReader(BytesIO(chunk_pdf)))
+                card_count += chunk_len
+                print(f"Rendered {card_count} cards ({len(writer.pages)} pages)...")
+        
+        with metrics.span("pdf save", "render"), open(output_file, 'wb') as f:
+            writer.write(f)
+        return card_count, len(writer.pages)
+    
+    def _render_incremental(self, song_iter, output_file, workers):
+        from page_cache import page_key
+        from pdf_stream import StreamingPDFWriter
         
-        c.save()
-        print(f"\nPDF saved to: {output_file}")
+        cache = self.page_cache
+        fingerprint = self.layout_fingerprint()
+        pool = None
+        if workers > 1:
+            pool = _new_render_pool(workers)
+        
+        pending = deque()
+        card_count = 0
+        rendered = 0
+        
+        try:
+            with open(output_file, 'wb') as f:
+                writer = StreamingPDFWriter(f)
+                while True:
+                    # Look pages up ahead of assembly so misses render in the pool
+                    # while earlier pages are being copied out
+                    while len(pending) < workers * 2:
+                        page_songs = list(islice(song_iter, self.cards_per_page))
+                        if not page_songs:
+                            break
+                        key = page_key(fingerprint, page_songs, self.qr_generator.payload)
+                        page_pdf = cache.get(key)
+                        if page_pdf is None and pool is not None:
+                            page_pdf = pool.submit(_render_chunk, page_songs)
+                        elif page_pdf is None:
+                            page_pdf = self.render_chunk(page_songs)
+                            cache.put(key, page_pdf)
+                            rendered += 1
+                        pending.append((key, len(page_songs), page_pdf))
+                    
+                    if not pending:
+                        break
+                    
+                    key, page_len, page_pdf = pending.popleft()
+                    if not isinstance(page_pdf, bytes):
+                        with metrics.span("render chunk wait", "render", cards=page_len):
+                            page_pdf = page_pdf.result()
+                        cache.put(key, page_pdf)
+                        rendered += 1
+                    with metrics.span("pdf merge", "render"):
+                        writer.add_pdf(page_pdf)
+                    card_count += page_len
+                
+                with metrics.span("pdf save", "render"):
+                    writer.close()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        
+        page_pairs = writer.page_count // 2
+        print(f"Re-rendered {rendered} of {page_pairs} page pairs, "
+              f"{page_pairs - rendered} reused from {self.page_cache_dir}")
+        cache.prune()
+        return card_count, writer.page_count
+    
+    def generate_pdf(self, songs, output_file, workers=None):
+        """
+        Render songs as double-sided card pages (QR fronts, info backs).
+        
+        Args:
+            songs: Deck or list of Songs, or any iterable/generator of them. Songs
+                   are taken one page at a time, so only the current page of
+                   cards is held in memory
+            output_file: Path of the PDF to write
+            workers: Number of render processes (default: config.RENDER_WORKERS,
+                     0 = one per CPU core). With more than one, the deck is split
+                     into page-pair chunks rendered in parallel and merged in order.
+                     With a page cache, pages whose songs are unchanged since
+                     an earlier build are copied from it and only the rest
+                     are rendered
+            
+        Returns:
+            Number of cards rendered
+        """
+        workers = config.RENDER_WORKERS if workers is None else workers
+        workers = workers or os.cpu_count() or 1
+        
+        total_songs = len(songs) if hasattr(songs, '__len__') else None
+        total_pages = None
+        if total_songs is not None:
+            total_pages = (total_songs + self.cards_per_page - 1) // self.cards_per_page * 2
+            print(f"\nGenerating PDF with {total_songs} songs...")
+            print(f"Total pages: {total_pages} ({total_pages // 2} front, {total_pages // 2} back)")
+        else:
+            print("\nGenerating PDF from song stream...")
+        
+        with metrics.span("generate pdf", "render", workers=workers):
+            if self.page_cache_dir:
+                card_count, page_num = self._render_incremental(iter(songs), output_file, workers)
+            elif workers > 1:
+                card_count, page_num = self._render_parallel(iter(songs), output_file, workers)
+            else:
+                card_count, page_num = self._render_sequential(iter(songs), output_file, total_pages)
+        
+        print(f"\nPDF saved to: {output_file} ({card_count} cards, {page_num} pages)")
         print("\nPrinting instructions:")
         print("1. Print odd pages (QR codes)")
         print("2. Flip paper stack")
         print("3. Print even pages (song info)")
         print("4. Cut along borders")
+        
+        return card_count
+
+
+_worker_generator = None
+
+
+def _new_render_pool(workers):
+    """
+    Process pool for _render_chunk. Spawned rather than forked: songs often
+    stream in from fetch threads (pipeline.stream_in_background) that may be
+    holding the metrics, sqlite or urllib3 locks a forked child would inherit.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _render_chunk(songs):
+    """Process pool entry point: render one chunk with a per-process generator."""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = PDFGenerator()
+    return _worker_generator.render_chunk(songs)
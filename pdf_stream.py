@@ -0,0 +1,143 @@
+"""Write one PDF incrementally from separately rendered chunk PDFs."""
+
+from io import BytesIO
+
+
+# Object numbers reserved for the document catalog and the page tree, which
+# are only written at the end once every page is known
+CATALOG_NUMBER = 1
+PAGES_NUMBER = 2
+
+
+class StreamingPDFWriter:
+    """
+    Appends the pages of complete PDFs (e.g. PDFGenerator.render_chunk output)
+    to an output stream as soon as they are added.
+
+    Unlike pypdf's PdfWriter, nothing is kept in memory except the byte offset
+    of every object written: each page and the objects it uses are copied out
+    immediately, and the page tree, catalog and cross-reference table follow
+    on close(). Objects shared by the pages of one chunk (fonts, forms) are
+    written once per chunk.
+    """
+
+    def __init__(self, stream):
+        """
+        Args:
+            stream: Binary file-like object with write()
+        """
+        self.stream = stream
+        self.position = 0
+        self.page_count = 0
+        self._offsets = {}
+        self._page_numbers = []
+        self._next_number = PAGES_NUMBER + 1
+        self._closed = False
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes):
+        self.stream.write(data)
+        self.position += len(data)
+
+    def _allocate(self) -> int:
+        number = self._next_number
+        self._next_number += 1
+        return number
+
+    def _write_object(self, number: int, obj):
+        self._offsets[number] = self.position
+        body = BytesIO()
+        obj.write_to_stream(body)
+        self._write(f"{number} 0 obj\n".encode() + body.getvalue() + b"\nendobj\n")
+
+    def add_pdf(self, data: bytes) -> int:
+        """
+        Append every page of a PDF.
+
+        Args:
+            data: Complete PDF file contents
+
+        Returns:
+            Number of pages added
+        """
+        from pypdf import PdfReader
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+
+        if self._closed:
+            raise ValueError("StreamingPDFWriter is closed")
+
+        reader = PdfReader(BytesIO(data))
+        numbers = {}  # (idnum, generation) in the chunk -> number in the output
+        pending = []
+
+        def remap(obj):
+            # Point indirect references at output object numbers, queueing
+            # objects seen for the first time; containers are rewritten in place
+            if isinstance(obj, IndirectObject):
+                key = (obj.idnum, obj.generation)
+                if key not in numbers:
+                    numbers[key] = self._allocate()
+                    pending.append(key)
+                return IndirectObject(numbers[key], 0, None)
+            if isinstance(obj, DictionaryObject):
+                for name in list(obj.keys()):
+                    obj[name] = remap(obj.raw_get(name))
+            elif isinstance(obj, ArrayObject):
+                for i in range(len(obj)):
+                    obj[i] = remap(list.__getitem__(obj, i))
+            return obj
+
+        pages = []
+        for page in reader.pages:
+            reference = page.indirect_reference
+            key = (reference.idnum, reference.generation)
+            numbers[key] = self._allocate()
+            pages.append((key, page))
+
+        for key, page in pages:
+            # pypdf copies inherited attributes (Resources, MediaBox, ...) onto
+            # each page, so the chunk's own page tree can be dropped
+            del page[NameObject("/Parent")]
+            remap(page)
+            page[NameObject("/Parent")] = IndirectObject(PAGES_NUMBER, 0, None)
+            self._write_object(numbers[key], page)
+            self._page_numbers.append(numbers[key])
+
+            while pending:
+                child_key = pending.pop()
+                child = reader.get_object(IndirectObject(child_key[0], child_key[1], reader))
+                self._write_object(numbers[child_key], remap(child))
+
+        self.page_count += len(pages)
+        return len(pages)
+
+    def close(self):
+        """Write the page tree, catalog, cross-reference table and trailer."""
+        from pypdf.generic import (
+            ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+        )
+
+        if self._closed:
+            return
+        self._closed = True
+
+        self._write_object(PAGES_NUMBER, DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(
+                IndirectObject(number, 0, None) for number in self._page_numbers
+            ),
+            NameObject("/Count"): NumberObject(len(self._page_numbers)),
+        }))
+        self._write_object(CATALOG_NUMBER, DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): IndirectObject(PAGES_NUMBER, 0, None),
+        }))
+
+        xref_offset = self.position
+        size = self._next_number
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        lines.extend(f"{self._offsets[number]:010d} 00000 n \n" for number in range(1, size))
+        lines.append(f"trailer\n<< /Size {size} /Root {CATALOG_NUMBER} 0 R >>\n")
+        lines.append(f"startxref\n{xref_offset}\n%%EOF\n")
+        self._write(''.join(lines).encode())
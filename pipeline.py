@@ -0,0 +1,66 @@
+"""Producer/consumer helpers that overlap song fetching with PDF rendering."""
+
+import queue
+import threading
+import config
+
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def stream_in_background(iterable, maxsize: int = None):
+    """
+    Consume an iterable on a background thread and yield its items.
+
+    Items pass through a bounded queue, so the producer (e.g. Spotify
+    fetching) runs ahead of the consumer (e.g. PDF rendering) by at most
+    `maxsize` items. Exceptions raised by the producer are re-raised in the
+    consumer; if the consumer stops early the producer is told to stop.
+
+    Args:
+        iterable: Items to produce (typically a generator doing network I/O)
+        maxsize: Queue capacity (default: config.PIPELINE_QUEUE_SIZE)
+
+    Yields:
+        Items of iterable, in order
+    """
+    items = queue.Queue(maxsize=maxsize or config.PIPELINE_QUEUE_SIZE)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_Failure(e))
+        else:
+            put(_DONE)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
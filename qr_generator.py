@@ -1,44 +1,321 @@
 """QR code generation for Spotify song URLs."""
 
+import hashlib
+import os
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
 import qrcode
-from PIL import Image
+from qrcode import util
 from io import BytesIO
 import config
+import metrics
+
+
+_TRACK_ID_RE = re.compile(
+    r'(?:open\.spotify\.com/(?:intl-[A-Za-z-]+/)?track/|spotify:track:)([0-9A-Za-z]+)'
+)
+_URL_HOST_RE = re.compile(r'^https?://[^/]+/', re.IGNORECASE)
+
+_ENCODING_MODES = (util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE)
+# Approximate cost of one character in each mode, in sixths of a bit
+_CHAR_COST = {util.MODE_NUMBER: 20, util.MODE_ALPHA_NUM: 33, util.MODE_8BIT_BYTE: 48}
+# First and last version of each character count field size class
+_VERSION_CLASSES = ((1, 9), (10, 26), (27, 40))
+
+
+def _can_encode(byte: int, mode: int) -> bool:
+    if mode == util.MODE_NUMBER:
+        return 0x30 <= byte <= 0x39
+    if mode == util.MODE_ALPHA_NUM:
+        return byte in util.ALPHA_NUM
+    return True
+
+
+def _segment_bits(segments, version: int) -> int:
+    """Exact bit length of segments encoded at a version, headers included."""
+    sizes = util.mode_sizes_for_version(version)
+    bits = 0
+    for segment in segments:
+        length = len(segment.data)
+        if segment.mode == util.MODE_NUMBER:
+            data_bits = length // 3 * 10 + (0, 4, 7)[length % 3]
+        elif segment.mode == util.MODE_ALPHA_NUM:
+            data_bits = length // 2 * 11 + length % 2 * 6
+        else:
+            data_bits = length * 8
+        bits += 4 + sizes[segment.mode] + data_bits
+    return bits
+
+
+def _min_bits(data: bytes, version: int) -> int:
+    """Lower bound of any segmentation: one header plus each byte in its cheapest mode."""
+    sizes = util.mode_sizes_for_version(version)
+    cost = sum(
+        _CHAR_COST[next(mode for mode in _ENCODING_MODES if _can_encode(byte, mode))]
+        for byte in data
+    )
+    return 4 + min(sizes.values()) + cost // 6
+
+
+def _optimal_segments(data: bytes, version: int) -> list:
+    """
+    Split data into numeric/alphanumeric/byte segments using the fewest bits.
+    
+    Dynamic programming over the mode of each character: staying in a mode
+    costs the per-character bits, switching adds a segment header (mode
+    indicator plus the character count field for this version range).
+    
+    Args:
+        data: Payload bytes
+        version: QR version whose character count field sizes to assume
+        
+    Returns:
+        List of qrcode.util.QRData segments
+    """
+    sizes = util.mode_sizes_for_version(version)
+    header = {mode: (4 + sizes[mode]) * 6 for mode in _ENCODING_MODES}
+    
+    costs = {None: 0}  # mode of the previous character -> cheapest cost so far
+    steps = []
+    for byte in data:
+        new_costs = {}
+        step = {}
+        for mode in _ENCODING_MODES:
+            if not _can_encode(byte, mode):
+                continue
+            prev_mode, cost = min(
+                ((prev, cost + (0 if prev == mode else header[mode]))
+                 for prev, cost in costs.items()),
+                key=lambda option: option[1]
+            )
+            new_costs[mode] = cost + _CHAR_COST[mode]
+            step[mode] = prev_mode
+        steps.append(step)
+        costs = new_costs
+    
+    # Walk back from the cheapest final mode to recover each character's mode
+    mode = min(costs, key=costs.get)
+    char_modes = []
+    for step in reversed(steps):
+        char_modes.append(mode)
+        mode = step[mode]
+    char_modes.reverse()
+    
+    segments = []
+    start = 0
+    for end in range(1, len(data) + 1):
+        if end == len(data) or char_modes[end] != char_modes[start]:
+            segments.append(util.QRData(data[start:end], mode=char_modes[start], check_data=False))
+            start = end
+    return segments
 
 
 class QRGenerator:
     """Generator for QR codes linking to Spotify songs."""
     
-    def __init__(self, qr_size: int = None):
+    def __init__(self, qr_size: int = None, cache_size: int = None, cache_dir: str = None,
+                 payload_mode: str = None):
         """
         Initialize QR code generator.
         
         Args:
             qr_size: Size of QR code in pixels
+            payload_mode: What to encode for a track URL: "url" as given,
+                          "canonical" https://open.spotify.com/track/<id> without
+                          query strings, or "uri" spotify:track:<id>
+                          (default: config.QR_PAYLOAD)
+            cache_size: Number of module matrices kept in the in-memory LRU
+                        (default: config.QR_CACHE_SIZE)
+            cache_dir: Directory for an on-disk matrix store shared between
+                       runs (default: config.QR_CACHE_DIR, None = memory only)
         """
         self.qr_size = qr_size or config.QR_SIZE
+        self.payload_mode = payload_mode or config.QR_PAYLOAD
+        if self.payload_mode not in ('url', 'canonical', 'uri'):
+            raise ValueError(f"Unknown QR payload mode: {self.payload_mode!r}")
+        self.cache_size = cache_size or config.QR_CACHE_SIZE
+        self.cache_dir = cache_dir or config.QR_CACHE_DIR
+        self.hits = 0
+        self.misses = 0
+        
+        self._matrices = OrderedDict()
+        self._images = OrderedDict()  # cache_key -> PNG bytes ("image" render mode)
+        self._lock = threading.Lock()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
     
-    def generate_qr_code(self, url: str) -> Image.Image:
+    def payload(self, url: str) -> str:
         """
-        Generate a QR code for a given URL.
+        Shortest text to encode for a track URL, according to payload_mode.
+        URLs that aren't Spotify track links are encoded unchanged.
         
         Args:
-            url: URL to encode in QR code
+            url: Song URL
             
         Returns:
-            PIL Image object containing the QR code
+            Text to put in the QR code
         """
-        qr = qrcode.QRCode(
-            version=1,
+        if self.payload_mode == 'url':
+            return url
+        
+        match = _TRACK_ID_RE.search(url)
+        if not match:
+            return url
+        
+        if self.payload_mode == 'uri':
+            return f"spotify:track:{match.group(1)}"
+        return f"https://open.spotify.com/track/{match.group(1)}"
+    
+    def cache_key(self, url: str) -> str:
+        """Content address of a QR code: stable hash of the encoded payload."""
+        return hashlib.sha1(self.payload(url).encode('utf-8')).hexdigest()
+    
+    def _new_qr(self) -> qrcode.QRCode:
+        return qrcode.QRCode(
+            version=None,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
             box_size=10,
             border=4,
         )
-        qr.add_data(url)
-        qr.make(fit=True)
+    
+    def _build_qr(self, url: str) -> qrcode.QRCode:
+        """
+        Build the QR code structure for a URL, picking the smallest version.
+        
+        qrcode's own encoding is the default. Mixed numeric/alphanumeric/byte
+        segments, also tried with an upper-cased scheme and host
+        (case-insensitive, but alphanumeric-encodable), are only used when
+        their bit length, computed arithmetically, fits a lower version.
+        
+        Args:
+            url: URL to encode in QR code
+            
+        Returns:
+            qrcode.QRCode with its module matrix computed
+        """
+        payload = self.payload(url)
         
-        # Create QR code image
-        img = qr.make_image(fill_color="black", back_color="white")
+        qr = self._new_qr()
+        qr.add_data(payload)
+        plain_version = qr.best_fit()
+        
+        # Readers guess the charset of byte segments, and UTF-8 text split
+        # across several modes confuses some of them: keep it in one piece
+        best = None
+        if payload.isascii() and plain_version > 1:
+            limits = util.BIT_LIMIT_TABLE[qr.error_correction]
+            variants = [payload]
+            host = _URL_HOST_RE.match(payload)
+            if host:
+                variants.append(host.group(0).upper() + payload[host.end():])
+            
+            for text in variants:
+                data = text.encode('ascii')
+                for first, last in _VERSION_CLASSES:
+                    # Only a version below the plain one is worth the segments
+                    target = min(last, (best[0] if best else plain_version) - 1)
+                    if first > target or _min_bits(data, first) > limits[target]:
+                        continue
+                    segments = _optimal_segments(data, first)
+                    version = bisect_left(limits, _segment_bits(segments, first), first)
+                    if version <= target:
+                        best = (version, segments)
+        
+        if best is None:
+            qr.make(fit=False)
+            return qr
+        
+        qr = self._new_qr()
+        for segment in best[1]:
+            qr.add_data(segment)
+        qr.version = best[0]
+        qr.make(fit=False)
+        return qr
+    
+    def _read_disk_matrix(self, key: str):
+        path = os.path.join(self.cache_dir, key + '.qr')
+        try:
+            with open(path, encoding='ascii') as f:
+                return [[module == '1' for module in row] for row in f.read().split()]
+        except OSError:
+            return None
+    
+    def _write_disk_matrix(self, key: str, matrix: list):
+        path = os.path.join(self.cache_dir, key + '.qr')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='ascii') as f:
+            f.write('\n'.join(''.join('1' if m else '0' for m in row) for row in matrix))
+        os.replace(tmp_path, path)
+    
+    def generate_qr_matrix(self, url: str) -> list:
+        """
+        Generate the module matrix of a QR code for a given URL.
+        
+        The matrix includes the quiet-zone border, so it covers the same
+        area as the image returned by generate_qr_code. Results are cached
+        by payload in memory and, if cache_dir is set, on disk. Callers must
+        not modify the returned matrix.
+        
+        Args:
+            url: URL to encode in QR code
+            
+        Returns:
+            List of rows, each a list of bools (True = dark module)
+        """
+        payload = self.payload(url)
+        with self._lock:
+            matrix = self._matrices.get(payload)
+            if matrix is not None:
+                self._matrices.move_to_end(payload)
+                self.hits += 1
+                metrics.count("qr.cache_hits")
+                return matrix
+        
+        key = self.cache_key(url)
+        matrix = self._read_disk_matrix(key) if self.cache_dir else None
+        
+        with self._lock:
+            if matrix is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        
+        if matrix is None:
+            with metrics.span("qr build", "qr"):
+                matrix = self._build_qr(url).get_matrix()
+            metrics.count("qr.cache_misses")
+            if self.cache_dir:
+                self._write_disk_matrix(key, matrix)
+        
+        with self._lock:
+            self._matrices[payload] = matrix
+            if len(self._matrices) > self.cache_size:
+                self._matrices.popitem(last=False)
+        
+        return matrix
+    
+    def generate_qr_code(self, url: str) -> "Image.Image":
+        """
+        Generate a QR code for a given URL.
+        
+        Args:
+            url: URL to encode in QR code
+            
+        Returns:
+            PIL Image object containing the QR code
+        """
+        from PIL import Image
+        
+        # Draw the cached matrix one pixel per module (0 = black), at the
+        # same box size qrcode's make_image uses
+        matrix = self.generate_qr_matrix(url)
+        modules = len(matrix)
+        img = Image.new('1', (modules, modules))
+        img.putdata([0 if module else 1 for row in matrix for module in row])
+        box_size = self._new_qr().box_size
+        img = img.resize((modules * box_size, modules * box_size), Image.Resampling.NEAREST)
         
         # Resize to desired size
         img = img.resize((self.qr_size, self.qr_size), Image.Resampling.LANCZOS)
@@ -49,18 +326,34 @@ class QRGenerator:
         """
         Generate QR code and return as bytes.
         
+        The PNG is cached in memory by payload, so duplicate songs are only
+        encoded once.
+        
         Args:
             url: URL to encode in QR code
             
         Returns:
             QR code image as bytes
         """
-        img = self.generate_qr_code(url)
+        key = self.cache_key(url)
+        with self._lock:
+            png = self._images.get(key)
+            if png is not None:
+                self._images.move_to_end(key)
+                return png
+        
+        with metrics.span("qr image", "qr"):
+            img = self.generate_qr_code(url)
         
         # Convert to bytes
         img_bytes = BytesIO()
         img.save(img_bytes, format='PNG')
-        img_bytes.seek(0)
+        png = img_bytes.getvalue()
+        
+        with self._lock:
+            self._images[key] = png
+            if len(self._images) > self.cache_size:
+                self._images.popitem(last=False)
         
-        return img_bytes.getvalue()
+        return png
 
@@ -0,0 +1,136 @@
+"""Rate limiting and retry handling for Spotify Web API calls."""
+
+import threading
+import time
+import config
+import metrics
+
+
+# Status codes spotipy's session should keep retrying by itself. 429 is left
+# out so the RateLimiter sees it and can pause every worker at once.
+SERVER_ERROR_CODES = (500, 502, 503, 504)
+
+
+def route_throttling_to_limiter(sp):
+    """
+    Make a spotipy client raise 429s instead of retrying them itself.
+
+    urllib3 retries any response carrying Retry-After on the calling thread
+    only, whatever status_forcelist says, so the RateLimiter would never see
+    the 429 and the other workers would keep sending. The session adapters
+    are remounted with the same retry settings, minus that behaviour; 5xx
+    responses are still retried with backoff. Clients without a session are
+    left alone.
+
+    Args:
+        sp: spotipy.Spotify instance
+    """
+    session = getattr(sp, '_session', None)
+    if session is None or not hasattr(session, 'mount'):
+        return
+
+    import requests
+    import urllib3
+
+    retry = urllib3.Retry(
+        total=sp.retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        status=sp.status_retries,
+        backoff_factor=sp.backoff_factor,
+        status_forcelist=SERVER_ERROR_CODES,
+        respect_retry_after_header=False,
+    )
+    adapter = requests.adapters.HTTPAdapter(max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+
+class RateLimiter:
+    """Token bucket shared by all threads that talk to the Spotify API."""
+
+    def __init__(self, max_in_flight: int = None, requests_per_second: float = None,
+                 max_retries: int = None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            max_in_flight: Maximum number of requests running at the same time
+            requests_per_second: Sustained request rate (also the burst size)
+            max_retries: How many times a 429 response is retried before giving up
+        """
+        self.max_in_flight = max_in_flight or config.MAX_CONCURRENT_REQUESTS
+        self.rate = requests_per_second or config.REQUESTS_PER_SECOND
+        self.max_retries = config.MAX_RATE_LIMIT_RETRIES if max_retries is None else max_retries
+        self.capacity = max(1.0, self.rate)
+
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+
+    def _acquire_token(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    elapsed = max(0.0, now - self._last_refill)
+                    self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                    self._last_refill = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        Stop handing out tokens to every thread for the given time.
+
+        Args:
+            seconds: How long to wait before the next request may start
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._last_refill = self._blocked_until
+            self._tokens = 0.0
+
+    def call(self, func, *args, **kwargs):
+        """
+        Run a spotipy call once a token is available, retrying on 429.
+
+        Args:
+            func: spotipy method to call
+            *args, **kwargs: Arguments passed to func
+
+        Returns:
+            Whatever func returns
+        """
+        from spotipy.exceptions import SpotifyException
+
+        attempt = 0
+        while True:
+            self._acquire_token()
+            with self._in_flight:
+                try:
+                    return func(*args, **kwargs)
+                except SpotifyException as e:
+                    if e.http_status != 429 or attempt >= self.max_retries:
+                        raise
+                    retry_after = _retry_after_seconds(e.headers, attempt)
+                    metrics.count("api.throttled")
+
+            attempt += 1
+            self.pause(retry_after)
+
+
+def _retry_after_seconds(headers, attempt: int) -> float:
+    try:
+        return max(0.0, float(headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        # No usable header: fall back to exponential backoff
+        return float(2 ** attempt)
@@ -0,0 +1,76 @@
+"""
+Render a deck file to printable cards, without Spotify.
+
+Usage:
+    python render_deck.py liked.csv                        # Writes game_cards.pdf
+    python render_deck.py deck.json --output table3.pdf
+    python render_deck.py liked.csv --shuffle --seed 7 --limit 60
+    python render_deck.py liked.csv --page-cache .page_cache   # Rebuilds redraw only changed pages
+
+Deck files are CSV (e.g. from filter_liked_songs.py --output), JSON or JSONL;
+see song.load_deck for the accepted columns.
+"""
+
+import argparse
+import random
+import sys
+import metrics
+from song import load_deck
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render a CSV/JSON deck file to a game card PDF (no network needed)."
+    )
+    parser.add_argument("deck", help="Deck file (.csv, .json or .jsonl)")
+    parser.add_argument("--output", "-o", default="game_cards.pdf",
+                        help="PDF file to write (default: game_cards.pdf)")
+    parser.add_argument("--shuffle", action="store_true", help="Shuffle the deck before rendering")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Shuffle seed, for a reproducible order")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Render at most this many songs (after shuffling)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Render processes (default: config.RENDER_WORKERS, 0 = one per core)")
+    parser.add_argument("--page-cache", metavar="DIR", default=None,
+                        help="Keep rendered pages in DIR and only re-render pages whose songs "
+                             "changed since the last build (default: config.PAGE_CACHE_DIR)")
+    metrics.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile:
+        metrics.enable()
+    
+    try:
+        deck = load_deck(args.deck)
+    except (OSError, ValueError) as e:
+        print(f"\nERROR: Could not read deck {args.deck}: {e}")
+        sys.exit(1)
+    
+    songs = list(deck)
+    if args.shuffle:
+        random.Random(args.seed).shuffle(songs)
+    if args.limit is not None:
+        songs = songs[:max(0, args.limit)]
+    
+    if not songs:
+        print(f"\nERROR: No songs in {args.deck}")
+        sys.exit(1)
+    
+    print(f"Loaded {len(deck)} songs from {args.deck}")
+    
+    from pdf_generator import PDFGenerator
+    
+    card_count = PDFGenerator(page_cache_dir=args.page_cache).generate_pdf(songs, args.output, workers=args.workers)
+    print(f"\n✓ File: {args.output} | Cards: {card_count}")
+    
+    if args.profile:
+        metrics.write_profile(args.profile, args.profile_format)
+    return card_count
+
+
+if __name__ == "__main__":
+    main()
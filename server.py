@@ -0,0 +1,370 @@
+"""
+Deck rendering service: keeps Spotify, caches and the renderer warm between decks.
+
+Usage:
+    python server.py                         # Listens on config.SERVER_HOST:SERVER_PORT
+    python server.py --port 9000 --workers 8
+
+Endpoints:
+    POST /decks    JSON deck request, answered with the PDF (chunked, streamed)
+    GET  /health   Status, active renders and cache statistics
+
+Deck request (either playlists, fetched like main.py, or ready-made songs):
+
+    {"playlists": ["https://open.spotify.com/playlist/...", ...],
+     "songs_per_playlist": 10, "duplicates": "drop", "sample": true, "seed": 4,
+     "filename": "table-3.pdf"}
+
+    {"songs": [{"title": "...", "artists": "...", "year": "1999", "url": "..."}]}
+
+The PDF is written out chunk by chunk (config.RENDER_CHUNK_PAGES page pairs)
+while later playlists are still being fetched, so the first pages arrive
+before the deck is finished. Chunks are rendered by a pool of --workers
+long-lived processes, each keeping its own warm generator and QR cache. At
+most --workers decks are served at once; requests beyond that wait up to
+config.SERVER_QUEUE_TIMEOUT seconds, then get 503.
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import chain, islice
+import config
+
+
+_FILENAME_RE = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+class DeckRequestError(ValueError):
+    """The deck request is invalid (answered with 400)."""
+
+
+class _ChunkedWriter:
+    """File-like wrapper sending writes as HTTP/1.1 chunks, buffered to `size` bytes."""
+
+    def __init__(self, wfile, size=64 * 1024):
+        self.wfile = wfile
+        self.size = size
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= self.size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.wfile.write(f"{len(self._buffer):X}\r\n".encode() + bytes(self._buffer) + b"\r\n")
+            self._buffer.clear()
+        self.wfile.flush()
+
+    def close(self):
+        self.flush()
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class DeckService:
+    """Warm state shared by all requests: one Spotify client, caches and render processes."""
+
+    def __init__(self, workers=None, spotify=None):
+        """
+        Args:
+            workers: Render processes, and decks served at the same time
+                     (default: config.SERVER_WORKERS)
+            spotify: SpotifyClient to use (default: created on first playlist request)
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.workers = workers or config.SERVER_WORKERS
+        # Spawned rather than forked: the pool grows from request threads
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.active = 0
+        self.served = 0
+        self._spotify = spotify
+        self._spotify_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._lock = threading.Lock()
+
+    @property
+    def spotify(self):
+        with self._spotify_lock:
+            if self._spotify is None:
+                from spotify_client import SpotifyClient
+                self._spotify = SpotifyClient()
+            return self._spotify
+
+    @property
+    def can_fetch_playlists(self) -> bool:
+        return self._spotify is not None or bool(config.SPOTIFY_CLIENT_ID and config.SPOTIFY_CLIENT_SECRET)
+
+    def warm_up(self):
+        """Create the Spotify client and fetch its token ahead of the first request."""
+        auth = getattr(self.spotify.sp, 'auth_manager', None)
+        if auth is not None:
+            auth.get_access_token(as_dict=False)
+
+    def start_workers(self):
+        """Start the render processes and load their generators ahead of the first request."""
+        from pdf_generator import _render_chunk
+
+        for future in [self._pool.submit(_render_chunk, []) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+
+    def parse_request(self, body: dict) -> dict:
+        """
+        Validate a deck request.
+
+        Returns:
+            Dict with keys: songs (Deck or None), playlists, songs_per_playlist,
+            duplicates, sample, seed, filename
+
+        Raises:
+            DeckRequestError: If the request is malformed
+        """
+        from song import Deck, song_from_record
+
+        if not isinstance(body, dict):
+            raise DeckRequestError("Expected a JSON object")
+
+        songs = None
+        playlists = body.get("playlists")
+        if body.get("songs") is not None:
+            try:
+                songs = Deck(song_from_record(record) for record in body["songs"])
+            except (TypeError, ValueError, AttributeError) as e:
+                raise DeckRequestError(f"Invalid songs: {e}")
+            if not songs:
+                raise DeckRequestError("No songs in request")
+        elif not isinstance(playlists, list) or not playlists:
+            raise DeckRequestError('Request needs "playlists" (a non-empty list) or "songs"')
+        elif not self.can_fetch_playlists:
+            raise DeckRequestError('This server has no Spotify credentials: send "songs" instead of "playlists"')
+
+        try:
+            songs_per_playlist = int(body["songs_per_playlist"]) if body.get("songs_per_playlist") is not None else None
+            seed = int(body["seed"]) if body.get("seed") is not None else None
+        except (TypeError, ValueError):
+            raise DeckRequestError('"songs_per_playlist" and "seed" must be integers')
+        if songs_per_playlist is not None and songs_per_playlist <= 0:
+            raise DeckRequestError('"songs_per_playlist" must be positive')
+
+        duplicates = body.get("duplicates")
+        if duplicates not in (None, "keep", "drop"):
+            raise DeckRequestError('"duplicates" must be "keep" or "drop"')
+
+        filename = _FILENAME_RE.sub("_", str(body.get("filename") or "game_cards.pdf"))
+        return {
+            "songs": songs,
+            "playlists": playlists,
+            "songs_per_playlist": songs_per_playlist,
+            "duplicates": duplicates,
+            "sample": bool(body["sample"]) if body.get("sample") is not None else None,
+            "seed": seed,
+            "filename": filename if filename.endswith(".pdf") else filename + ".pdf",
+        }
+
+    def iter_songs(self, deck_request):
+        """Songs of a parsed request; playlists are fetched on a background thread."""
+        if deck_request["songs"] is not None:
+            return iter(deck_request["songs"])
+
+        from pipeline import stream_in_background
+
+        return stream_in_background(self.spotify.iter_multiple_playlists(
+            deck_request["playlists"], deck_request["songs_per_playlist"],
+            deck_request["duplicates"], deck_request["sample"], deck_request["seed"]
+        ))
+
+    def render(self, songs, stream) -> int:
+        """
+        Render songs into `stream` chunk by chunk on the process pool.
+
+        Args:
+            songs: Iterator of Songs
+            stream: Binary file-like object; flushed after every chunk
+
+        Returns:
+            Number of cards rendered
+        """
+        from pdf_generator import _render_chunk
+        from pdf_stream import StreamingPDFWriter
+
+        chunk_size = config.CARDS_PER_PAGE * config.RENDER_CHUNK_PAGES
+        writer = StreamingPDFWriter(stream)
+        pending = deque()
+        card_count = 0
+
+        try:
+            while True:
+                # Keep a bounded number of chunks in flight, like
+                # PDFGenerator._render_parallel, and write them out in order
+                while len(pending) < self.workers * 2:
+                    chunk = list(islice(songs, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append((len(chunk), self._pool.submit(_render_chunk, chunk)))
+
+                if not pending:
+                    break
+
+                chunk_len, future = pending.popleft()
+                writer.add_pdf(future.result())
+                stream.flush()
+                card_count += chunk_len
+        finally:
+            # Client gone or render failed: drop this deck's queued chunks
+            for _, future in pending:
+                future.cancel()
+
+        writer.close()
+        return card_count
+
+    def acquire(self) -> bool:
+        if not self._slots.acquire(timeout=config.SERVER_QUEUE_TIMEOUT):
+            return False
+        with self._lock:
+            self.active += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            self.served += 1
+        self._slots.release()
+
+    def health(self) -> dict:
+        spotify = self._spotify
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "active": self.active,
+            "served": self.served,
+            "track_cache": spotify.track_cache.stats() if spotify and spotify.track_cache else None,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "DeckService/1.0"
+
+    def log_message(self, format, *args):
+        print(f"[{self.log_date_time_string()}] {self.address_string()} {format % args}")
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._send_json(200, self.server.service.health())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/decks":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        service = self.server.service
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            deck_request = service.parse_request(json.loads(self.rfile.read(length) or b"null"))
+        except (ValueError, DeckRequestError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        if not service.acquire():
+            self._send_json(503, {"error": "All workers busy, try again later"})
+            return
+
+        songs = None
+        try:
+            # Fetch errors (no client, bad playlist, API failure) surface here
+            # or with the first song, while a proper error status can still be sent
+            try:
+                songs = service.iter_songs(deck_request)
+                first_song = next(songs, None)
+            except Exception as e:
+                self._send_json(502, {"error": f"Could not fetch songs: {e}"})
+                return
+            if first_song is None:
+                self._send_json(422, {"error": "No songs fetched, check the playlist URLs"})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Disposition", f'attachment; filename="{deck_request["filename"]}"')
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            stream = _ChunkedWriter(self.wfile)
+            try:
+                card_count = service.render(chain([first_song], songs), stream)
+                stream.close()
+                print(f"Served {deck_request['filename']} ({card_count} cards)")
+            except Exception as e:
+                # Headers are gone; dropping the connection without the final
+                # chunk tells the client the PDF is incomplete
+                print(f"ERROR: rendering {deck_request['filename']} failed: {e}")
+                self.close_connection = True
+        finally:
+            # Stops a background fetch the client no longer waits for
+            if hasattr(songs, "close"):
+                songs.close()
+            service.release()
+
+
+class DeckServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, _Handler)
+        self.service = service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve game card PDFs over HTTP with warm caches.")
+    parser.add_argument("--host", default=config.SERVER_HOST, help=f"Interface (default: {config.SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT, help=f"Port (default: {config.SERVER_PORT})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Render processes and decks served at the same time "
+                             "(default: config.SERVER_WORKERS)")
+    args = parser.parse_args(argv)
+
+    service = DeckService(args.workers)
+    print(f"Starting {service.workers} render processes...")
+    service.start_workers()
+    if config.SPOTIFY_CLIENT_ID and config.SPOTIFY_CLIENT_SECRET:
+        print("Connecting to Spotify...")
+        service.warm_up()
+    else:
+        print("No Spotify credentials: only requests with \"songs\" can be served")
+
+    server = DeckServer((args.host, args.port), service)
+    print(f"Serving decks on http://{args.host}:{args.port}/decks ({service.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
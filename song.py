@@ -0,0 +1,157 @@
+"""Song record and deck container shared by fetching, exporting and rendering."""
+
+import csv
+import json
+from typing import NamedTuple
+
+
+class Song(NamedTuple):
+    """One card: a track and who brought it. Immutable and slot-sized."""
+
+    title: str
+    artists: str
+    year: str
+    url: str
+    id: str = None
+    popularity: int = 0
+    album: str = ''
+    playlist_owner: str = None
+
+
+def song_from_track(track: dict) -> Song:
+    """
+    Build a Song from a Spotify track object.
+
+    Args:
+        track: Full (or field-projected) track object from the Web API
+
+    Returns:
+        Song without a playlist_owner
+    """
+    artists = ', '.join([a['name'] for a in track['artists']])
+    release_date = track['album'].get('release_date')
+    year = release_date.split('-')[0] if release_date else 'Unknown'
+
+    return Song(
+        title=track['name'],
+        artists=artists,
+        year=year,
+        url=track['external_urls']['spotify'],
+        id=track['id'],
+        popularity=track.get('popularity', 0),
+        album=track['album'].get('name', ''),
+    )
+
+
+class Deck:
+    """
+    Immutable, column-oriented collection of songs.
+
+    Each Song field is stored as one tuple, so a deck costs a handful of
+    tuples instead of one object per track. Indexing and iteration give
+    Song records back; slicing gives a Deck.
+    """
+
+    __slots__ = ('_columns',)
+
+    def __init__(self, songs=()):
+        """
+        Args:
+            songs: Iterable of Song records
+        """
+        columns = tuple(zip(*songs))
+        self._columns = columns or tuple(() for _ in Song._fields)
+
+    @classmethod
+    def _from_columns(cls, columns):
+        deck = cls.__new__(cls)
+        deck._columns = columns
+        return deck
+
+    def column(self, name: str) -> tuple:
+        """
+        Args:
+            name: Song field name, e.g. "url"
+
+        Returns:
+            Tuple with that field of every song, in deck order
+        """
+        return self._columns[Song._fields.index(name)]
+
+    def __len__(self):
+        return len(self._columns[0])
+
+    def __iter__(self):
+        return map(Song._make, zip(*self._columns))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Deck._from_columns(tuple(column[index] for column in self._columns))
+        return Song._make(column[index] for column in self._columns)
+
+    def __eq__(self, other):
+        return isinstance(other, Deck) and self._columns == other._columns
+
+    def __repr__(self):
+        return f"<Deck of {len(self)} songs>"
+
+
+# Column names accepted in deck files besides the Song field names (the
+# liked-songs CSV export uses name/artist)
+_FIELD_ALIASES = {'name': 'title', 'artist': 'artists', 'player': 'playlist_owner'}
+
+
+def song_from_record(record: dict) -> Song:
+    """
+    Build a Song from a deck file row or object.
+
+    Args:
+        record: Mapping with at least title/name, artists/artist and url;
+                unknown keys are ignored
+
+    Returns:
+        Song
+    """
+    fields = {}
+    for key, value in record.items():
+        key = _FIELD_ALIASES.get(key.strip().lower(), key.strip().lower()) if key else key
+        if key in Song._fields and value not in (None, ''):
+            fields[key] = value
+
+    missing = [name for name in ('title', 'artists', 'url') if name not in fields]
+    if missing:
+        raise ValueError(f"Deck entry is missing {', '.join(missing)}: {record}")
+
+    if isinstance(fields['artists'], list):
+        fields['artists'] = ', '.join(fields['artists'])
+    fields['year'] = str(fields.get('year', 'Unknown'))
+    fields['popularity'] = int(fields.get('popularity', 0))
+    return Song(**fields)
+
+
+def load_deck(path: str) -> Deck:
+    """
+    Load a deck from a file, without touching the network.
+
+    Supported formats (by extension):
+        .csv   - header row, e.g. the liked-songs export (name, artist, year, url, ...)
+        .jsonl - one song object per line
+        .json  - a list of song objects, or an object with a "songs" list
+
+    Args:
+        path: Deck file
+
+    Returns:
+        Deck in file order
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            records = list(csv.DictReader(f))
+        elif path.lower().endswith('.jsonl'):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = json.load(f)
+            if isinstance(records, dict):
+                records = records.get('songs', [])
+
+    return Deck(song_from_record(record) for record in records)
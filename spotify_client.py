@@ -1,10 +1,110 @@
+import math
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 import config
+import metrics
+from rate_limiter import RateLimiter, SERVER_ERROR_CODES, route_throttling_to_limiter
+from song import Deck, song_from_track
+from track_cache import PlaylistSnapshotCache, TrackCache
+
+
+# Playlist page projections: only the attributes song_from_track reads, or
+# just the IDs when metadata comes from the cache
+TRACK_FIELDS = (
+    'items(track(id,name,popularity,artists(name),'
+    'album(name,release_date),external_urls(spotify))),next'
+)
+TRACK_ID_FIELDS = 'items(track(id)),next'
+MAX_PAGE_SIZE = 100
+
+# Track cache hit rate above which pages are fetched ID-only. Every 50 misses
+# then cost a /tracks call returning full, unprojectable track objects, so
+# that only pays off when nearly every ID is cached.
+ID_ONLY_MIN_HIT_RATE = 0.9
+
+
+def _estimate_tracks_needed(needed, seen, passed):
+    """
+    Estimate how many tracks to look at to collect `needed` more songs.
+    
+    Args:
+        needed: Songs still missing
+        seen: Tracks examined so far
+        passed: Tracks that passed the popularity filter so far
+        
+    Returns:
+        Number of tracks to examine next (at least 1)
+    """
+    if config.MIN_TRACK_POPULARITY <= 0:
+        return max(1, needed)
+    
+    # Smoothed pass rate (starts at 50%) with some headroom, so a strict
+    # filter asks for more tracks instead of topping up one at a time
+    pass_rate = (passed + 1) / (seen + 2)
+    return max(1, math.ceil(needed * 1.25 / pass_rate))
+
+
+def _next_page_size(needed, seen, passed):
+    """Pick the next page size (1-100) from the filter pass rate seen so far."""
+    return min(MAX_PAGE_SIZE, _estimate_tracks_needed(needed, seen, passed))
+
+
+def _draw_offsets(rng, total, used, count):
+    """Draw up to `count` distinct random offsets in [0, total) not in `used`."""
+    available = total - len(used)
+    count = min(count, available)
+    
+    if count * 2 > available:
+        # Nearly exhausted: sampling from what is left beats rejection sampling
+        return rng.sample([o for o in range(total) if o not in used], count)
+    
+    drawn = []
+    picked = set()
+    while len(drawn) < count:
+        offset = rng.randrange(total)
+        if offset not in used and offset not in picked:
+            picked.add(offset)
+            drawn.append(offset)
+    return drawn
+
+
+def _group_into_pages(offsets):
+    """Group offsets into (offset, limit) windows of at most one page each."""
+    windows = []
+    for offset in sorted(offsets):
+        if windows and offset - windows[-1][0] < MAX_PAGE_SIZE:
+            windows[-1][1] = offset - windows[-1][0] + 1
+        else:
+            windows.append([offset, 1])
+    return [tuple(window) for window in windows]
 
 
 class SpotifyClient:
-    def __init__(self):
+    def __init__(self, sp=None):
+        """
+        Args:
+            sp: Preconfigured spotipy.Spotify to use instead of a client-credentials
+                one (e.g. pointed at a test server); no credentials needed then
+        """
+        self.sp = sp or self._create_spotify()
+        metrics.instrument_session(self.sp)
+        route_throttling_to_limiter(self.sp)
+        self.rate_limiter = RateLimiter()
+        self.track_cache = TrackCache() if config.TRACK_CACHE_PATH else None
+        self.snapshot_cache = (
+            PlaylistSnapshotCache()
+            if config.TRACK_CACHE_PATH and config.PLAYLIST_SNAPSHOT_CACHE else None
+        )
+        # Cache coverage of the track IDs seen on playlist pages, for _page_fields
+        self._ids_seen = 0
+        self._ids_cached = 0
+        self._coverage_lock = threading.Lock()
+    
+    @staticmethod
+    def _create_spotify():
         if not config.SPOTIFY_CLIENT_ID or not config.SPOTIFY_CLIENT_SECRET:
             raise ValueError(
                 "Spotify credentials not found. Set SPOTIFY_CLIENT_ID "
@@ -15,52 +115,169 @@ class SpotifyClient:
             client_id=config.SPOTIFY_CLIENT_ID,
             client_secret=config.SPOTIFY_CLIENT_SECRET
         )
-        self.sp = spotipy.Spotify(auth_manager=auth)
+        if config.SPOTIFY_ACCOUNTS_URL:
+            auth.OAUTH_TOKEN_URL = config.SPOTIFY_ACCOUNTS_URL.rstrip('/') + '/api/token'
+        
+        sp = spotipy.Spotify(auth_manager=auth, status_forcelist=SERVER_ERROR_CODES)
+        if config.SPOTIFY_API_URL:
+            sp.prefix = config.SPOTIFY_API_URL
+        return sp
     
     def extract_playlist_id(self, url):
         if 'spotify.com/playlist/' in url:
             return url.split('playlist/')[-1].split('?')[0]
         return url
     
-    def get_playlist_songs(self, playlist_url, num_songs=None):
+    def _resolve_tracks(self, track_ids):
+        """Return a dict of Songs for track IDs, only hitting the API for cache misses."""
+        songs = self.track_cache.get_many(track_ids)
+        missing = [track_id for track_id in dict.fromkeys(track_ids) if track_id not in songs]
+        self._record_coverage(len(songs), len(songs) + len(missing))
+        
+        fetched = []
+        for start in range(0, len(missing), 50):
+            batch = missing[start:start + 50]
+            with metrics.span("fetch tracks", "fetch", count=len(batch)):
+                results = self.rate_limiter.call(self.sp.tracks, batch)
+            fetched.extend(song_from_track(t) for t in results['tracks'] if t)
+        
+        self.track_cache.put_many(fetched)
+        songs.update((song.id, song) for song in fetched)
+        return songs
+    
+    def _record_coverage(self, cached, seen):
+        with self._coverage_lock:
+            self._ids_cached += cached
+            self._ids_seen += seen
+    
+    def _page_fields(self):
+        """Projection for the next playlist page: IDs only while the cache holds nearly all of them."""
+        if self.track_cache is None:
+            return TRACK_FIELDS
+        
+        with self._coverage_lock:
+            seen, cached = self._ids_seen, self._ids_cached
+        if seen and cached / seen >= ID_ONLY_MIN_HIT_RATE:
+            return TRACK_ID_FIELDS
+        return TRACK_FIELDS
+    
+    def _fetch_page_tracks(self, playlist_id, offset, limit):
+        """
+        Fetch one page of a playlist without resolving metadata.
+        
+        Returns:
+            Tuple (tracks, raw results); tracks line up with the page items and
+            hold None for empty or local tracks. When the track cache has been
+            hitting (see _page_fields) the tracks only carry their ID.
+        """
+        with metrics.span("fetch page", "fetch", playlist=playlist_id, offset=offset, limit=limit):
+            results = self.rate_limiter.call(
+                self.sp.playlist_tracks,
+                playlist_id,
+                fields=self._page_fields(),
+                offset=offset,
+                limit=limit
+            )
+        tracks = [item['track'] if item['track'] and item['track'].get('id') else None
+                  for item in results['items']]
+        return tracks, results
+    
+    def _to_songs(self, tracks):
+        """Turn page tracks into Songs (None stays None), using the cache if enabled."""
+        if not self.track_cache:
+            return [song_from_track(t) if t else None for t in tracks]
+        
+        # Tracks of full pages carry their metadata; the ones the cache lacks
+        # are written through to it. ID-only tracks are resolved from it.
+        fetched = [song_from_track(t) for t in tracks if t and 'name' in t]
+        if fetched:
+            # Read-only probe: nothing was served from the cache, so the
+            # hit/miss stats and LRU order stay untouched
+            cached = self.track_cache.fresh_ids([song.id for song in fetched])
+            self._record_coverage(len(cached), len({song.id for song in fetched}))
+            self.track_cache.put_many([song for song in fetched if song.id not in cached])
+        
+        resolved = self._resolve_tracks([t['id'] for t in tracks if t and 'name' not in t])
+        resolved.update((song.id, song) for song in fetched)
+        return [resolved.get(t['id']) if t else None for t in tracks]
+    
+    def get_playlist_songs(self, playlist_url, num_songs=None, sample=None, seed=None):
+        """
+        Fetch songs from a playlist.
+        
+        Args:
+            playlist_url: Playlist URL or ID
+            num_songs: Number of songs to return
+            sample: Pick songs at random positions across the whole playlist
+                    instead of taking the first ones (default: config.SAMPLE_PLAYLISTS)
+            seed: Seed for sampling; None gives a different deck every run
+                  (default: config.SAMPLE_SEED)
+            
+        Returns:
+            List of Songs
+        """
         num_songs = num_songs or config.SONGS_PER_PLAYLIST
+        sample = config.SAMPLE_PLAYLISTS if sample is None else sample
+        seed = config.SAMPLE_SEED if seed is None else seed
         playlist_id = self.extract_playlist_id(playlist_url)
         
+        # Unseeded samples must differ between runs, so they are never stored
+        use_snapshot = self.snapshot_cache and not (sample and seed is None)
+        
+        if not use_snapshot and not sample:
+            return self._fetch_playlist_songs(playlist_id, num_songs)
+        
+        # One cheap metadata call gives the snapshot_id and the track total
+        with metrics.span("fetch playlist meta", "fetch", playlist=playlist_id):
+            meta = self.rate_limiter.call(
+                self.sp.playlist, playlist_id, fields='snapshot_id,tracks(total)'
+            )
+        
+        if use_snapshot:
+            request_key = f"{num_songs}:{config.MIN_TRACK_POPULARITY}"
+            if sample:
+                request_key += f":sample={seed}"
+            
+            songs = self.snapshot_cache.get(playlist_id, request_key, meta['snapshot_id'])
+            if songs is not None:
+                return songs
+        
+        if sample:
+            rng = random.Random(f"{seed}:{playlist_id}" if seed is not None else None)
+            songs = self._sample_playlist_songs(
+                playlist_id, num_songs, meta['tracks']['total'], rng
+            )
+        else:
+            songs = self._fetch_playlist_songs(playlist_id, num_songs)
+        
+        if use_snapshot:
+            self.snapshot_cache.put(playlist_id, request_key, meta['snapshot_id'], songs)
+        return songs
+    
+    def _fetch_playlist_songs(self, playlist_id, num_songs):
         songs = []
         offset = 0
+        seen = 0
+        passed = 0
         
         while len(songs) < num_songs:
-            results = self.sp.playlist_tracks(
-                playlist_id,
-                offset=offset,
-                limit=min(100, num_songs - len(songs))
+            tracks, results = self._fetch_page_tracks(
+                playlist_id, offset, _next_page_size(num_songs - len(songs), seen, passed)
             )
             
             if not results['items']:
                 break
             
-            for item in results['items']:
-                if not item['track']:
+            for song in self._to_songs(tracks):
+                if not song:
                     continue
                 
-                track = item['track']
-                popularity = track.get('popularity', 0)
-                
-                if popularity < config.MIN_TRACK_POPULARITY:
+                seen += 1
+                if song.popularity < config.MIN_TRACK_POPULARITY:
                     continue
                 
-                artists = ', '.join([a['name'] for a in track['artists']])
-                release_date = track['album']['release_date']
-                year = release_date.split('-')[0] if release_date else 'Unknown'
-                
-                songs.append({
-                    'title': track['name'],
-                    'artists': artists,
-                    'year': year,
-                    'url': track['external_urls']['spotify'],
-                    'popularity': popularity,
-                    'playlist_owner': None
-                })
+                passed += 1
+                songs.append(song)
                 
                 if len(songs) >= num_songs:
                     break
@@ -71,17 +288,102 @@ class SpotifyClient:
         
         return songs[:num_songs]
     
-    def get_multiple_playlists(self, playlist_urls, songs_per_playlist=None):
-        all_songs = []
+    def _sample_playlist_songs(self, playlist_id, num_songs, total, rng):
+        """Pick songs at uniformly random positions, fetching only the pages that hold them."""
+        songs = []
+        used = set()
+        seen = 0
+        passed = 0
+        
+        while len(songs) < num_songs and len(used) < total:
+            wanted = _estimate_tracks_needed(num_songs - len(songs), seen, passed)
+            offsets = _draw_offsets(rng, total, used, wanted)
+            used.update(offsets)
+            
+            # Fetch the windows holding the drawn offsets, then resolve only the
+            # drawn tracks (in one batch) and skip the neighbours that came along
+            by_offset = {}
+            for offset, limit in _group_into_pages(offsets):
+                tracks, _ = self._fetch_page_tracks(playlist_id, offset, limit)
+                by_offset.update((offset + i, t) for i, t in enumerate(tracks))
+            
+            drawn = self._to_songs([by_offset.get(offset) for offset in offsets])
+            
+            # Keep the draw order so the deck isn't sorted by playlist position
+            for song in drawn:
+                if not song:
+                    continue
+                
+                seen += 1
+                if song.popularity < config.MIN_TRACK_POPULARITY:
+                    continue
+                
+                passed += 1
+                songs.append(song)
+                
+                if len(songs) >= num_songs:
+                    break
+        
+        return songs
+    
+    def iter_multiple_playlists(self, playlist_urls, songs_per_playlist=None, duplicates=None,
+                                sample=None, seed=None):
+        """
+        Fetch several playlists concurrently and yield their songs as they arrive.
+        
+        Songs come out in playlist order (all of Player 1, then Player 2, ...),
+        each tagged with its playlist_owner, as soon as that playlist is done.
         
-        for i, url in enumerate(playlist_urls):
-            print(f"Fetching playlist {i+1}/{len(playlist_urls)}...")
-            songs = self.get_playlist_songs(url, songs_per_playlist)
+        Args:
+            playlist_urls: Playlist URLs or IDs, one per player
+            songs_per_playlist: Number of songs per playlist
+            duplicates: "keep" every copy of a track shared between playlists,
+                        or "drop" all but the first (default: config.DUPLICATE_SONGS)
+            sample: Pick random songs instead of the first N (default: config.SAMPLE_PLAYLISTS)
+            seed: Seed for reproducible sampling (default: config.SAMPLE_SEED)
             
-            for song in songs:
-                song['playlist_owner'] = f"Player {i+1}"
+        Yields:
+            Songs
+        """
+        duplicates = duplicates or config.DUPLICATE_SONGS
+        if duplicates not in ('keep', 'drop'):
+            raise ValueError(f"Unknown duplicate policy: {duplicates!r} (use 'keep' or 'drop')")
+        
+        seen_ids = set()
+        dropped = 0
+        workers = max(1, min(len(playlist_urls), self.rate_limiter.max_in_flight))
+        
+        def fetch(url):
+            with metrics.span("fetch playlist", "fetch", playlist=url):
+                return self.get_playlist_songs(url, songs_per_playlist, sample, seed)
+        
+        print(f"Fetching {len(playlist_urls)} playlists ({workers} at a time)...")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fetch, url) for url in playlist_urls]
             
-            all_songs.extend(songs)
-            print(f"  Fetched {len(songs)} songs")
+            # Collect in submission order so the deck order stays deterministic
+            for i, future in enumerate(futures):
+                songs = future.result()
+                print(f"  Playlist {i+1}/{len(playlist_urls)}: fetched {len(songs)} songs")
+                
+                for song in songs:
+                    if duplicates == 'drop':
+                        if song.id in seen_ids:
+                            dropped += 1
+                            continue
+                        seen_ids.add(song.id)
+                    
+                    yield song._replace(playlist_owner=f"Player {i+1}")
         
-        return all_songs
+        if dropped:
+            print(f"Dropped {dropped} duplicate songs shared between playlists")
+        
+        if self.track_cache:
+            stats = self.track_cache.stats()
+            print(f"Track cache: {stats['hits']} hits, {stats['misses']} misses")
+    
+    def get_multiple_playlists(self, playlist_urls, songs_per_playlist=None, duplicates=None,
+                               sample=None, seed=None):
+        return Deck(self.iter_multiple_playlists(
+            playlist_urls, songs_per_playlist, duplicates, sample, seed
+        ))
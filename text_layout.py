@@ -0,0 +1,127 @@
+"""Cached text measurement and line layout for card text."""
+
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from reportlab.pdfbase.pdfmetrics import stringWidth
+import config
+import metrics
+
+
+ELLIPSIS = "..."
+
+
+class TextLayout:
+    """Measures and wraps text, caching glyph widths and finished layouts."""
+
+    def __init__(self, max_layouts: int = None):
+        """
+        Initialize the layout engine.
+
+        Args:
+            max_layouts: Number of (text, font, size, width) layouts kept in
+                         the LRU cache (default: config.TEXT_LAYOUT_CACHE_SIZE)
+        """
+        self.max_layouts = max_layouts or config.TEXT_LAYOUT_CACHE_SIZE
+        self._char_units = {}  # font_name -> {char: width in 1/1000 em}
+        self._word_units = {}  # font_name -> {word: width in 1/1000 em}
+        self._layouts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _char_unit(self, char: str, font_name: str) -> float:
+        units = self._char_units.setdefault(font_name, {})
+        width = units.get(char)
+        if width is None:
+            width = units[char] = stringWidth(char, font_name, 1000)
+        return width
+
+    def _text_units(self, text: str, font_name: str) -> float:
+        # Standard PDF fonts have no kerning, so a string is as wide as the sum
+        # of its glyphs; summing font units keeps results identical to
+        # reportlab's stringWidth, which scales the sum the same way
+        return sum(self._char_unit(ch, font_name) for ch in text)
+
+    def _word_unit(self, word: str, font_name: str) -> float:
+        units = self._word_units.setdefault(font_name, {})
+        width = units.get(word)
+        if width is None:
+            width = units[word] = self._text_units(word, font_name)
+        return width
+
+    def string_width(self, text: str, font_name: str, font_size: float) -> float:
+        """
+        Width of a string in points (same result as canvas.stringWidth).
+        """
+        return self._text_units(text, font_name) * 0.001 * font_size
+
+    def _ellipsize(self, text: str, font_name: str, font_size: float, max_width: float) -> str:
+        # Prefix sums of glyph widths; binary search for the longest prefix
+        # that still fits with the ellipsis (never shorter than 10 characters)
+        prefix = [0.0]
+        for ch in text:
+            prefix.append(prefix[-1] + self._char_unit(ch, font_name))
+
+        ellipsis = self._word_unit(ELLIPSIS, font_name)
+        fitting = bisect_right(
+            [(units + ellipsis) * 0.001 * font_size for units in prefix], max_width
+        )
+        keep = max(10, fitting - 1)
+        return text[:keep] + ELLIPSIS
+
+    def _wrap_words(self, text: str, font_name: str, font_size: float, max_width: float) -> list:
+        space = self._char_unit(' ', font_name)
+        lines = []
+        current_line = []
+        current_units = 0.0
+
+        for word in text.split():
+            word_units = self._word_unit(word, font_name)
+            test_units = current_units + space + word_units if current_line else word_units
+            if test_units * 0.001 * font_size <= max_width:
+                current_line.append(word)
+                current_units = test_units
+            else:
+                if current_line:
+                    lines.append(' '.join(current_line))
+                current_line = [word]
+                current_units = word_units
+
+        if current_line:
+            lines.append(' '.join(current_line))
+
+        return lines or [text]
+
+    def wrap(self, text: str, font_name: str, font_size: float, max_width: float) -> list:
+        """
+        Wrap text into lines that fit max_width.
+        If text is longer than 50 characters, ellipsizes instead of wrapping.
+
+        Args:
+            text: Text to wrap
+            font_name: Font name
+            font_size: Font size
+            max_width: Maximum width in points
+
+        Returns:
+            List of text lines
+        """
+        key = (text, font_name, font_size, max_width)
+        with self._lock:
+            lines = self._layouts.get(key)
+            if lines is not None:
+                self._layouts.move_to_end(key)
+                metrics.count("text_layout.cache_hits")
+                return list(lines)
+
+        with metrics.span("text layout", "layout"):
+            if len(text) > 50:
+                lines = (self._ellipsize(text, font_name, font_size, max_width),)
+            else:
+                lines = tuple(self._wrap_words(text, font_name, font_size, max_width))
+
+        with self._lock:
+            self._layouts[key] = lines
+            if len(self._layouts) > self.max_layouts:
+                self._layouts.popitem(last=False)
+
+        return list(lines)
@@ -0,0 +1,216 @@
+"""Persistent cache of Spotify track metadata keyed by track ID."""
+
+import json
+import sqlite3
+import threading
+import time
+import config
+from song import Song
+
+
+def _song_data(song: Song) -> dict:
+    # playlist_owner depends on the deck, not the track
+    data = song._asdict()
+    del data['playlist_owner']
+    return data
+
+
+class TrackCache:
+    """SQLite-backed track metadata cache with TTL and LRU eviction."""
+
+    def __init__(self, path: str = None, ttl: float = None, max_entries: int = None):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite file to store the cache in
+            ttl: Seconds a cached record stays valid (popularity drifts over time)
+            max_entries: Maximum number of records kept; least recently used go first
+        """
+        self.path = path or config.TRACK_CACHE_PATH
+        self.ttl = config.TRACK_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or config.TRACK_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tracks ("
+                "id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS tracks_accessed_at ON tracks (accessed_at)"
+            )
+            # Upper bound of the row count, so put_many only counts rows when
+            # eviction might be due
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def get_many(self, track_ids: list) -> dict:
+        """
+        Look up several tracks at once.
+
+        Args:
+            track_ids: Spotify track IDs
+
+        Returns:
+            Dict mapping track ID to Song for every fresh cache hit
+        """
+        if not track_ids:
+            return {}
+
+        now = time.time()
+        unique_ids = list(dict.fromkeys(track_ids))
+        placeholders = ','.join('?' * len(unique_ids))
+
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                f"SELECT id, data FROM tracks WHERE id IN ({placeholders}) AND fetched_at >= ?",
+                (*unique_ids, now - self.ttl)
+            ).fetchall()
+            found = {track_id: Song(**json.loads(data)) for track_id, data in rows}
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE tracks SET accessed_at = ? WHERE id = ?",
+                    [(now, track_id) for track_id in found]
+                )
+
+            self.hits += len(found)
+            self.misses += len(unique_ids) - len(found)
+
+        return found
+
+    def fresh_ids(self, track_ids: list) -> set:
+        """
+        Which tracks have a fresh record, without reading or touching them.
+
+        Unlike get_many this leaves the hit/miss counters and the LRU order
+        alone, so it can be used to estimate how useful the cache would be.
+
+        Args:
+            track_ids: Spotify track IDs
+
+        Returns:
+            Set of the IDs with a record younger than the TTL
+        """
+        if not track_ids:
+            return set()
+
+        unique_ids = list(dict.fromkeys(track_ids))
+        placeholders = ','.join('?' * len(unique_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM tracks WHERE id IN ({placeholders}) AND fetched_at >= ?",
+                (*unique_ids, time.time() - self.ttl)
+            ).fetchall()
+        return {track_id for track_id, in rows}
+
+    def put_many(self, songs: list):
+        """
+        Store songs by track ID, evicting the least recently used ones if full.
+
+        Args:
+            songs: Song records (playlist_owner is not stored)
+        """
+        if not songs:
+            return
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tracks (id, data, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(song.id, json.dumps(_song_data(song)), now, now) for song in songs]
+            )
+
+            self._entries += len(songs)
+            if self._entries <= self.max_entries:
+                return
+
+            count = self._conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM tracks WHERE id IN "
+                    "(SELECT id FROM tracks ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._entries = min(count, self.max_entries)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            Dict with keys: hits, misses, entries
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PlaylistSnapshotCache:
+    """Resolved playlist song lists, valid while the playlist snapshot_id is unchanged."""
+
+    def __init__(self, path: str = None, ttl: float = None):
+        """
+        Open (or create) the snapshot table in the cache database.
+
+        Args:
+            path: SQLite file to store the cache in
+            ttl: Seconds a stored song list stays valid even if the snapshot matches
+                 (track popularity, and so the filter result, drifts over time)
+        """
+        self.path = path or config.TRACK_CACHE_PATH
+        self.ttl = config.TRACK_CACHE_TTL if ttl is None else ttl
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS playlist_snapshots ("
+                "playlist_id TEXT NOT NULL, request_key TEXT NOT NULL, "
+                "snapshot_id TEXT NOT NULL, songs TEXT NOT NULL, fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (playlist_id, request_key))"
+            )
+
+    def get(self, playlist_id: str, request_key: str, snapshot_id: str):
+        """
+        Args:
+            playlist_id: Spotify playlist ID
+            request_key: Identifies the fetch parameters (song count, filters)
+            snapshot_id: Current snapshot_id of the playlist
+
+        Returns:
+            Stored list of Songs, or None if missing, stale or outdated
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT songs FROM playlist_snapshots WHERE playlist_id = ? "
+                "AND request_key = ? AND snapshot_id = ? AND fetched_at >= ?",
+                (playlist_id, request_key, snapshot_id, time.time() - self.ttl)
+            ).fetchone()
+        return [Song(**data) for data in json.loads(row[0])] if row else None
+
+    def put(self, playlist_id: str, request_key: str, snapshot_id: str, songs: list):
+        """
+        Args:
+            playlist_id: Spotify playlist ID
+            request_key: Identifies the fetch parameters (song count, filters)
+            snapshot_id: snapshot_id the songs were fetched at
+            songs: Songs to store (playlist_owner is not stored)
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO playlist_snapshots "
+                "(playlist_id, request_key, snapshot_id, songs, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (playlist_id, request_key, snapshot_id,
+                 json.dumps([_song_data(song) for song in songs]), time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()